@@ -13,12 +13,15 @@ class Config:
     MIN_AMPLITUDE = 10
     FAN_VALUE = 5
     
+    # Matching
+    MATCH_EARLY_EXIT_THRESHOLD = None  # e.g. 0.3 to stop once a song is clearly aligned
+    
     # Storage
-    STORAGE_TYPE = 'memory'  # 'memory', 'sqlite', 'postgres'
+    STORAGE_TYPE = 'memory'  # 'memory', 'mmap', 'sqlite', 'postgres'
     
     # API
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    ALLOWED_EXTENSIONS = {'mp3', 'wav', 'flac', 'm4a', 'ogg'}
+    ALLOWED_EXTENSIONS = frozenset({'mp3', 'wav', 'flac', 'm4a', 'ogg'})
     
     # Logging
     LOG_LEVEL = 'INFO'
@@ -12,6 +12,7 @@ class DevelopmentConfig(Config):
     # Storage
     STORAGE_TYPE = 'memory'
     SQLITE_DATABASE_PATH = './data/database/fingerprint_dev.db'
+    MMAP_INDEX_DIR = './data/database/fingerprint_index_dev'
     
     # Logging
     LOG_LEVEL = 'DEBUG'
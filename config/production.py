@@ -12,6 +12,7 @@ class ProductionConfig(Config):
     # Storage
     STORAGE_TYPE = 'sqlite'  # or 'postgres'
     SQLITE_DATABASE_PATH = './data/database/fingerprint.db'
+    MMAP_INDEX_DIR = './data/database/fingerprint_index'
     
     # PostgreSQL (optional)
     POSTGRES_HOST = 'localhost'
@@ -4,8 +4,10 @@ import os
 from flask import Flask
 from flask_cors import CORS
 
-from ..storage import MemoryStore, SQLiteStore, PostgresStore
+from ..core import Fingerprinter
+from ..storage import MemoryStore, MmapStore, SQLiteStore, PostgresStore
 from ..utils.logger import setup_logger
+from .responses import ORJSONProvider
 
 
 def create_app(config_name='development'):
@@ -29,6 +31,15 @@ def create_app(config_name='development'):
     config_class = config_map.get(config_name, 'config.default.Config')
     app.config.from_object(config_class)
     
+    # Normalize allowed extensions once for the upload validators
+    app.config['ALLOWED_EXTENSIONS'] = frozenset(
+        extension.lower() for extension in app.config.get('ALLOWED_EXTENSIONS', ())
+    )
+    
+    # Use orjson for response serialization when it is installed
+    if ORJSONProvider is not None:
+        app.json = ORJSONProvider(app)
+    
     # Setup CORS
     cors_origins = app.config.get('CORS_ORIGINS', '*')
     CORS(app, origins=cors_origins)
@@ -45,6 +56,8 @@ def create_app(config_name='development'):
     
     if storage_type == 'memory':
         storage = MemoryStore()
+    elif storage_type == 'mmap':
+        storage = MmapStore(app.config.get('MMAP_INDEX_DIR', 'fingerprint_index'))
     elif storage_type == 'sqlite':
         db_path = app.config.get('SQLITE_DATABASE_PATH', 'fingerprint.db')
         storage = SQLiteStore(db_path)
@@ -62,6 +75,15 @@ def create_app(config_name='development'):
     app.storage = storage
     logger.info(f"Initialized {storage_type} storage backend")
     
+    # Build the fingerprinter once; its parameters are fixed by config
+    app.fingerprinter = Fingerprinter(
+        sr=app.config.get('SAMPLE_RATE', 11025),
+        n_fft=app.config.get('N_FFT', 2048),
+        hop_length=app.config.get('HOP_LENGTH', 512),
+        peak_neighborhood_size=app.config.get('PEAK_NEIGHBORHOOD_SIZE', 20),
+        min_amplitude=app.config.get('MIN_AMPLITUDE', 10)
+    )
+    
     # Register blueprints
     from .routes import api_bp
     app.register_blueprint(api_bp, url_prefix='/api/v1')
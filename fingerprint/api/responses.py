@@ -1,6 +1,31 @@
 """Response formatting utilities."""
 
 from flask import jsonify
+from flask.json.provider import JSONProvider, DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+
+if orjson is not None:
+    class ORJSONProvider(JSONProvider):
+        """Flask JSON provider backed by orjson."""
+        
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(
+                obj,
+                default=DefaultJSONProvider.default,
+                option=self.option
+            ).decode()
+        
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+else:
+    ORJSONProvider = None
 
 
 def format_search_response(matches, processing_time_ms, query_duration_sec):
@@ -2,84 +2,112 @@
 
 import os
 import time
-import tempfile
 from flask import Blueprint, request, current_app, jsonify
 from werkzeug.utils import secure_filename
 
-from ..core import load_audio, preprocess_audio, Fingerprinter, generate_hashes, match_fingerprint
-from .validators import validate_audio_file
+from ..core import load_audio_bytes, preprocess_audio, generate_hashes, match_fingerprint
+from .validators import validate_audio_file, validate_audio_stream
 from .responses import format_search_response, format_error_response
 
 
 api_bp = Blueprint('api', __name__)
 
 
+def _read_query_audio():
+    """
+    Validate the uploaded query audio and read it into memory.
+    
+    Raw application/octet-stream bodies are read straight from the
+    request stream, bypassing the multipart form parser.
+    
+    Returns:
+        tuple: (audio_bytes, filename, error_response); error_response is
+            None on success
+    """
+    allowed_extensions = current_app.config.get('ALLOWED_EXTENSIONS')
+    max_size = current_app.config.get('MAX_CONTENT_LENGTH')
+    
+    if request.mimetype == 'application/octet-stream':
+        filename = request.args.get('filename', '')
+        
+        # Validate file
+        is_valid, error_msg = validate_audio_stream(
+            filename,
+            request.content_length,
+            allowed_extensions,
+            max_size
+        )
+        if not is_valid:
+            return None, None, format_error_response(error_msg, 400)
+        
+        return request.get_data(cache=False), filename, None
+    
+    # Validate request
+    if 'audio' not in request.files:
+        return None, None, format_error_response('No audio file provided', 400)
+    
+    audio_file = request.files['audio']
+    
+    # Validate file
+    is_valid, error_msg = validate_audio_file(
+        audio_file,
+        allowed_extensions,
+        max_size,
+        content_length=request.content_length
+    )
+    if not is_valid:
+        return None, None, format_error_response(error_msg, 400)
+    
+    return audio_file.read(), audio_file.filename, None
+
+
 @api_bp.route('/search', methods=['POST'])
 def search():
     """
     Search for a song by audio query.
     
-    Request: multipart/form-data with 'audio' file
+    Request: multipart/form-data with 'audio' file, or a raw
+        application/octet-stream body with a ?filename= query parameter
     Response: JSON with matches and metadata
     """
     start_time = time.time()
     
     try:
-        # Validate request
-        if 'audio' not in request.files:
-            return format_error_response('No audio file provided', 400)
+        audio_bytes, filename, error_response = _read_query_audio()
+        if error_response is not None:
+            return error_response
         
-        audio_file = request.files['audio']
+        # Decode and process audio
+        audio, sr = load_audio_bytes(
+            audio_bytes,
+            sr=current_app.config.get('SAMPLE_RATE', 11025),
+            suffix=os.path.splitext(filename)[1]
+        )
+        audio = preprocess_audio(audio)
         
-        # Validate file
-        is_valid, error_msg = validate_audio_file(
-            audio_file,
-            current_app.config.get('ALLOWED_EXTENSIONS'),
-            current_app.config.get('MAX_CONTENT_LENGTH')
+        # Generate fingerprint
+        peaks = current_app.fingerprinter.generate_fingerprint(audio)
+        
+        # Generate hashes
+        query_hashes = generate_hashes(
+            peaks,
+            song_id=None,
+            fan_value=current_app.config.get('FAN_VALUE', 5)
         )
-        if not is_valid:
-            return format_error_response(error_msg, 400)
         
-        # Save temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(audio_file.filename)[1]) as tmp_file:
-            audio_file.save(tmp_file.name)
-            tmp_filepath = tmp_file.name
+        # Match against database
+        matches = match_fingerprint(
+            query_hashes,
+            current_app.storage,
+            top_k=5,
+            early_exit_threshold=current_app.config.get('MATCH_EARLY_EXIT_THRESHOLD')
+        )
         
-        try:
-            # Load and process audio
-            audio, sr = load_audio(tmp_filepath, sr=current_app.config.get('SAMPLE_RATE', 11025))
-            audio = preprocess_audio(audio)
-            
-            # Generate fingerprint
-            fingerprinter = Fingerprinter(
-                sr=sr,
-                n_fft=current_app.config.get('N_FFT', 2048),
-                hop_length=current_app.config.get('HOP_LENGTH', 512),
-                peak_neighborhood_size=current_app.config.get('PEAK_NEIGHBORHOOD_SIZE', 20),
-                min_amplitude=current_app.config.get('MIN_AMPLITUDE', 10)
-            )
-            peaks = fingerprinter.generate_fingerprint(audio)
-            
-            # Generate hashes
-            query_hashes = generate_hashes(
-                peaks,
-                song_id=None,
-                fan_value=current_app.config.get('FAN_VALUE', 5)
-            )
-            
-            # Match against database
-            matches = match_fingerprint(query_hashes, current_app.storage, top_k=5)
-            
-            # Calculate processing time
-            processing_time_ms = (time.time() - start_time) * 1000
-            
-            # Format response
-            return format_search_response(matches, processing_time_ms, len(audio) / sr)
+        # Calculate processing time
+        processing_time_ms = (time.time() - start_time) * 1000
         
-        finally:
-            # Clean up temp file
-            if os.path.exists(tmp_filepath):
-                os.unlink(tmp_filepath)
+        # Format response
+        return format_search_response(matches, processing_time_ms, len(audio) / sr)
     
     except Exception as e:
         current_app.logger.error(f"Search error: {str(e)}")
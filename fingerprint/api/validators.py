@@ -3,7 +3,73 @@
 import os
 
 
-def validate_audio_file(file, allowed_extensions, max_size=None):
+def _validate_extension(filename, allowed_extensions):
+    """
+    Check that filename has an allowed audio extension.
+    
+    Args:
+        filename: File name
+        allowed_extensions: Set of allowed file extensions
+    
+    Returns:
+        tuple: (is_valid, error_message)
+    """
+    _, dot, extension = filename.rpartition('.')
+    
+    if not dot or extension.lower() not in allowed_extensions:
+        return False, f'Invalid file type. Allowed: {", ".join(allowed_extensions)}'
+    
+    return True, None
+
+
+def _validate_size(file_size, max_size):
+    """
+    Check that file_size does not exceed max_size.
+    
+    Args:
+        file_size: File size in bytes
+        max_size: Maximum file size in bytes
+    
+    Returns:
+        tuple: (is_valid, error_message)
+    """
+    if file_size > max_size:
+        max_mb = max_size / (1024 * 1024)
+        return False, f'File too large. Maximum size: {max_mb:.1f}MB'
+    
+    return True, None
+
+
+def validate_audio_stream(filename, content_length, allowed_extensions, max_size=None):
+    """
+    Validate a raw (non-multipart) audio upload before reading its body.
+    
+    Args:
+        filename: Client-supplied file name (used for the extension)
+        content_length: Request Content-Length in bytes, or None
+        allowed_extensions: Set of allowed file extensions
+        max_size: Maximum file size in bytes (optional)
+    
+    Returns:
+        tuple: (is_valid, error_message)
+    """
+    if not filename:
+        return False, 'No file selected'
+    
+    is_valid, error_msg = _validate_extension(filename, allowed_extensions)
+    if not is_valid:
+        return is_valid, error_msg
+    
+    if not content_length:
+        return False, 'Empty request body'
+    
+    if max_size is not None:
+        return _validate_size(content_length, max_size)
+    
+    return True, None
+
+
+def validate_audio_file(file, allowed_extensions, max_size=None, content_length=None):
     """
     Validate uploaded audio file.
     
@@ -11,6 +77,8 @@ def validate_audio_file(file, allowed_extensions, max_size=None):
         file: Werkzeug FileStorage object
         allowed_extensions: Set of allowed file extensions
         max_size: Maximum file size in bytes (optional)
+        content_length: Request Content-Length in bytes (optional); an
+            upper bound on the file size used instead of seeking the upload
     
     Returns:
         tuple: (is_valid, error_message)
@@ -20,21 +88,22 @@ def validate_audio_file(file, allowed_extensions, max_size=None):
         return False, 'No file selected'
     
     # Check file extension
-    filename = file.filename.lower()
-    extension = filename.rsplit('.', 1)[-1] if '.' in filename else ''
-    
-    if extension not in allowed_extensions:
-        return False, f'Invalid file type. Allowed: {", ".join(allowed_extensions)}'
+    is_valid, error_msg = _validate_extension(file.filename, allowed_extensions)
+    if not is_valid:
+        return is_valid, error_msg
     
     # Check file size (if specified)
     if max_size is not None:
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
+        file_size = file.content_length or content_length
+        
+        # Seeking to the end forces a spooled upload to be fully buffered,
+        # so only measure the file when no length header is available
+        if file_size is None:
+            file.seek(0, os.SEEK_END)
+            file_size = file.tell()
+            file.seek(0)
         
-        if file_size > max_size:
-            max_mb = max_size / (1024 * 1024)
-            return False, f'File too large. Maximum size: {max_mb:.1f}MB'
+        return _validate_size(file_size, max_size)
     
     return True, None
 
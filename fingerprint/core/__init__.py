@@ -1,12 +1,13 @@
 """Core fingerprinting logic."""
 
-from .audio_processor import load_audio, preprocess_audio, audio_to_spectrogram
+from .audio_processor import load_audio, load_audio_bytes, preprocess_audio, audio_to_spectrogram
 from .fingerprinter import Fingerprinter
 from .hash_generator import generate_hashes
 from .matcher import match_fingerprint
 
 __all__ = [
     'load_audio',
+    'load_audio_bytes',
     'preprocess_audio',
     'audio_to_spectrogram',
     'Fingerprinter',
@@ -1,9 +1,26 @@
 """Audio loading and preprocessing utilities."""
 
+import io
+import os
+import tempfile
+
 import numpy as np
 import librosa
 import soundfile as sf
 
+# Use FFTW for librosa's STFT when pyFFTW is installed (optional)
+try:
+    import pyfftw
+    import pyfftw.interfaces.scipy_fft
+    
+    # Keep cached plans across files; the default 0.1 s keepalive drops
+    # them while the next file is still being decoded
+    pyfftw.interfaces.cache.enable()
+    pyfftw.interfaces.cache.set_keepalive_time(60)
+    librosa.set_fftlib(pyfftw.interfaces.scipy_fft)
+except ImportError:
+    pass
+
 
 def load_audio(filepath, sr=11025, mono=True):
     """
@@ -24,6 +41,46 @@ def load_audio(filepath, sr=11025, mono=True):
         raise IOError(f"Failed to load audio file {filepath}: {str(e)}")
 
 
+def load_audio_bytes(data, sr=11025, mono=True, suffix=''):
+    """
+    Decode audio from an in-memory buffer without touching disk.
+    
+    Formats libsndfile cannot decode (e.g. m4a) fall back to load_audio
+    through a temporary file.
+    
+    Args:
+        data: Encoded audio file contents (bytes)
+        sr: Target sample rate (default: 11025 Hz)
+        mono: Convert to mono if True (default: True)
+        suffix: Original file extension, used for the fallback path
+    
+    Returns:
+        tuple: (audio_samples, sample_rate)
+    """
+    try:
+        audio, source_sr = sf.read(io.BytesIO(data), dtype='float32', always_2d=False)
+    except Exception:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+            tmp_file.write(data)
+            tmp_filepath = tmp_file.name
+        try:
+            return load_audio(tmp_filepath, sr=sr, mono=mono)
+        finally:
+            os.unlink(tmp_filepath)
+    
+    try:
+        # soundfile returns (samples, channels); librosa expects channels first
+        if audio.ndim > 1:
+            audio = np.mean(audio, axis=1) if mono else audio.T
+        
+        if source_sr != sr:
+            audio = librosa.resample(audio, orig_sr=source_sr, target_sr=sr)
+        
+        return audio, sr
+    except Exception as e:
+        raise IOError(f"Failed to decode audio buffer: {str(e)}")
+
+
 def preprocess_audio(audio, normalize=True):
     """
     Preprocess audio signal.
@@ -42,16 +99,16 @@ def preprocess_audio(audio, normalize=True):
     if audio.ndim > 1:
         audio = np.mean(audio, axis=1)
     
-    # Normalize to [-1, 1] range
-    if normalize:
-        max_val = np.abs(audio).max()
+    # Normalize to [-1, 1] range; max/min avoid allocating an abs() copy
+    if normalize and audio.size:
+        max_val = max(audio.max(), -audio.min())
         if max_val > 0:
-            audio = audio / max_val
+            audio = audio * (1.0 / max_val)
     
     return audio
 
 
-def audio_to_spectrogram(audio, sr=11025, n_fft=2048, hop_length=512):
+def audio_to_spectrogram(audio, sr=11025, n_fft=2048, hop_length=512, window='hann'):
     """
     Convert audio signal to STFT spectrogram.
     
@@ -60,12 +117,13 @@ def audio_to_spectrogram(audio, sr=11025, n_fft=2048, hop_length=512):
         sr: Sample rate
         n_fft: FFT window size
         hop_length: Number of samples between successive frames
+        window: Window name or precomputed window array of length n_fft
     
     Returns:
         numpy array: Magnitude spectrogram (frequency x time)
     """
     # Compute Short-Time Fourier Transform
-    stft = librosa.stft(audio, n_fft=n_fft, hop_length=hop_length)
+    stft = librosa.stft(audio, n_fft=n_fft, hop_length=hop_length, window=window)
     
     # Get magnitude spectrogram
     spectrogram = np.abs(stft)
@@ -1,7 +1,8 @@
 """Core fingerprinting algorithm - spectral peak extraction."""
 
 import numpy as np
-from scipy.ndimage import maximum_filter
+from scipy.ndimage import maximum_filter1d
+from scipy.signal import get_window
 
 from .audio_processor import audio_to_spectrogram
 
@@ -26,6 +27,13 @@ class Fingerprinter:
         self.hop_length = hop_length
         self.peak_neighborhood_size = peak_neighborhood_size
         self.min_amplitude = min_amplitude
+        
+        # Peak-picking constants, validated once instead of per call
+        self._neighborhood_size = int(peak_neighborhood_size)
+        self._amplitude_threshold = float(min_amplitude)
+        
+        # Precompute the STFT window once (same periodic Hann librosa uses)
+        self._window = get_window('hann', n_fft, fftbins=True)
     
     def generate_fingerprint(self, audio):
         """
@@ -35,14 +43,15 @@ class Fingerprinter:
             audio: Audio samples (numpy array)
         
         Returns:
-            list: List of (time_idx, freq_idx, amplitude) tuples
+            tuple: (time_idx, freq_idx, amplitude) arrays sorted by time
         """
         # Compute spectrogram
         spectrogram = audio_to_spectrogram(
             audio, 
             sr=self.sr, 
             n_fft=self.n_fft, 
-            hop_length=self.hop_length
+            hop_length=self.hop_length,
+            window=self._window
         )
         
         # Find spectral peaks
@@ -58,45 +67,39 @@ class Fingerprinter:
             spectrogram: Magnitude spectrogram (freq x time)
         
         Returns:
-            list: List of (time_idx, freq_idx, amplitude) tuples
+            tuple: (time_idx, freq_idx, amplitude) arrays sorted by time
         """
-        # Apply logarithmic scaling
-        log_spectrogram = np.log1p(spectrogram)
-        
-        # Find local maxima using maximum filter
-        neighborhood_size = self.peak_neighborhood_size
-        local_max = maximum_filter(log_spectrogram, size=neighborhood_size) == log_spectrogram
-        
-        # Apply amplitude threshold
-        threshold_mask = log_spectrogram > np.log1p(self.min_amplitude)
-        
-        # Combine masks
-        peaks_mask = local_max & threshold_mask
-        
-        # Get peak coordinates
-        freq_idx, time_idx = np.where(peaks_mask)
+        # Find local maxima using a square maximum filter, applied as two
+        # separable 1-D passes (frequency axis, then time axis). log1p is
+        # monotonic, so this works on raw magnitudes without a log pass.
+        neighborhood_size = self._neighborhood_size
+        local_max_values = maximum_filter1d(spectrogram, size=neighborhood_size, axis=0)
+        maximum_filter1d(local_max_values, size=neighborhood_size, axis=1,
+                         output=local_max_values)
+        
+        # Combine local maxima and amplitude threshold masks in place
+        peaks_mask = np.equal(local_max_values, spectrogram)
+        peaks_mask &= spectrogram > self._amplitude_threshold
+        
+        # Get peak coordinates from the time-major view, so they come out
+        # sorted by time (then frequency) without a separate sort
+        time_idx, freq_idx = np.where(peaks_mask.T)
         amplitudes = spectrogram[freq_idx, time_idx]
         
-        # Create list of peaks
-        peaks = list(zip(time_idx, freq_idx, amplitudes))
-        
-        # Sort by time
-        peaks.sort(key=lambda x: x[0])
-        
-        return peaks
+        return time_idx, freq_idx.astype(np.int32), amplitudes
     
     def _create_constellation_map(self, peaks):
         """
         Create constellation map from peaks (for visualization).
         
         Args:
-            peaks: List of (time_idx, freq_idx, amplitude) tuples
+            peaks: (time_idx, freq_idx, amplitude) arrays
         
         Returns:
             dict: Constellation map
         """
         constellation = {}
-        for time_idx, freq_idx, amplitude in peaks:
+        for time_idx, freq_idx, amplitude in zip(*(column.tolist() for column in peaks)):
             if time_idx not in constellation:
                 constellation[time_idx] = []
             constellation[time_idx].append((freq_idx, amplitude))
@@ -1,5 +1,118 @@
 """Combinatorial hash generation from fingerprint peaks."""
 
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional
+    njit = None
+
+
+# Maximum anchor -> target time delta (10-bit encoding)
+MAX_TIME_DELTA = 1023
+
+
+def _peaks_to_arrays(peaks):
+    """
+    Convert peaks to (times, freqs) NumPy arrays.
+    
+    Args:
+        peaks: (time_idx, freq_idx, amplitude) arrays or list of tuples
+    
+    Returns:
+        tuple: (times, freqs) int64 arrays
+    """
+    if isinstance(peaks, tuple) and len(peaks) == 3 and isinstance(peaks[0], np.ndarray):
+        times, freqs, _ = peaks
+    elif len(peaks) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    else:
+        peak_array = np.asarray(peaks)
+        times, freqs = peak_array[:, 0], peak_array[:, 1]
+    
+    return times.astype(np.int64, copy=False), freqs.astype(np.int64, copy=False)
+
+
+def _generate_hashes_numpy(times, freqs, fan_value):
+    """
+    Build anchor/target hashes with one vectorized pass per fan-out step.
+    
+    Args:
+        times: Peak time indices (int64, sorted)
+        freqs: Peak frequency indices (int64)
+        fan_value: Number of subsequent peaks to pair with each anchor
+    
+    Returns:
+        tuple: (hash_values, time_offsets) arrays
+    """
+    num_peaks = len(times)
+    
+    # Row j-1 holds the hashes pairing each anchor i with peak i + j
+    hash_buffer = np.zeros((fan_value, num_peaks), dtype=np.int64)
+    valid_mask = np.zeros((fan_value, num_peaks), dtype=bool)
+    
+    for j in range(1, min(fan_value, num_peaks - 1) + 1):
+        # Calculate time deltas for all anchors at once
+        time_delta = times[j:] - times[:-j]
+        
+        # Skip if time delta is too large (> 1023 for 10-bit encoding)
+        valid_mask[j - 1, :-j] = time_delta <= MAX_TIME_DELTA
+        
+        # Generate hash: (f1 << 20) | (f2 << 10) | (Δt & 0x3FF)
+        hash_buffer[j - 1, :-j] = (
+            (freqs[:-j] << 20) |
+            (freqs[j:] << 10) |
+            (time_delta & 0x3FF)
+        )
+    
+    # Anchor time for every (j, i) slot
+    anchor_times = np.broadcast_to(times, (fan_value, num_peaks))
+    
+    # Flatten anchor-major so hashes keep the (anchor, target) ordering
+    hash_values = hash_buffer.T[valid_mask.T]
+    time_offsets = anchor_times.T[valid_mask.T].astype(np.int32)
+    
+    return hash_values, time_offsets
+
+
+def _generate_hashes_loop(times, freqs, fan_value):
+    """
+    Build anchor/target hashes with a scalar loop (compiled with numba).
+    
+    Args:
+        times: Peak time indices (int64, sorted)
+        freqs: Peak frequency indices (int64)
+        fan_value: Number of subsequent peaks to pair with each anchor
+    
+    Returns:
+        tuple: (hash_values, time_offsets) arrays
+    """
+    num_peaks = len(times)
+    hash_out = np.empty(num_peaks * fan_value, dtype=np.int64)
+    time_out = np.empty(num_peaks * fan_value, dtype=np.int32)
+    k = 0
+    
+    for i in range(num_peaks):
+        for j in range(1, fan_value + 1):
+            if i + j >= num_peaks:
+                break
+            
+            time_delta = times[i + j] - times[i]
+            if time_delta > MAX_TIME_DELTA:
+                continue
+            
+            hash_out[k] = (freqs[i] << 20) | (freqs[i + j] << 10) | (time_delta & 0x3FF)
+            time_out[k] = times[i]
+            k += 1
+    
+    return hash_out[:k], time_out[:k]
+
+
+if njit is not None:
+    _generate_hashes_numba = njit(cache=True)(_generate_hashes_loop)
+else:
+    _generate_hashes_numba = None
+
 
 def generate_hashes(peaks, song_id=None, fan_value=5):
     """
@@ -9,42 +122,29 @@ def generate_hashes(peaks, song_id=None, fan_value=5):
     Hash format: hash(freq1, freq2, time_delta)
     
     Args:
-        peaks: List of (time_idx, freq_idx, amplitude) tuples
+        peaks: (time_idx, freq_idx, amplitude) arrays or list of tuples,
+            sorted by time
         song_id: Optional song identifier
         fan_value: Number of subsequent peaks to pair with each anchor
     
     Returns:
-        list: List of (hash_value, time_offset, song_id) tuples
+        tuple: (hash_values, time_offsets, song_id) where hash_values is an
+            int64 array and time_offsets an int32 array of anchor times;
+            both are empty when there are fewer than two peaks
     """
-    hashes = []
+    times, freqs = _peaks_to_arrays(peaks)
     
-    # For each anchor point
-    for i in range(len(peaks)):
-        anchor_time, anchor_freq, _ = peaks[i]
-        
-        # Pair with next fan_value peaks
-        for j in range(1, fan_value + 1):
-            if i + j < len(peaks):
-                target_time, target_freq, _ = peaks[i + j]
-                
-                # Calculate time delta
-                time_delta = target_time - anchor_time
-                
-                # Skip if time delta is too large (> 1023 for 10-bit encoding)
-                if time_delta > 1023:
-                    continue
-                
-                # Generate hash: (f1 << 20) | (f2 << 10) | (Δt & 0x3FF)
-                hash_value = (
-                    (int(anchor_freq) << 20) | 
-                    (int(target_freq) << 10) | 
-                    (int(time_delta) & 0x3FF)
-                )
-                
-                # Store (hash, time_offset, song_id)
-                hashes.append((hash_value, anchor_time, song_id))
-    
-    return hashes
+    # A hash needs an anchor and a target peak
+    if len(times) < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32), song_id
+    
+    # Use the compiled kernel when numba is installed
+    if _generate_hashes_numba is not None:
+        hash_values, time_offsets = _generate_hashes_numba(times, freqs, fan_value)
+    else:
+        hash_values, time_offsets = _generate_hashes_numpy(times, freqs, fan_value)
+    
+    return hash_values, time_offsets, song_id
 
 
 def decode_hash(hash_value):
@@ -1,57 +1,317 @@
 """Fingerprint matching and scoring."""
 
-from collections import defaultdict, Counter
+import numpy as np
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional
+    njit = None
 
-def match_fingerprint(query_hashes, db_store, top_k=5):
+
+def _max_aligned_count(time_offsets):
+    """
+    Get the height of the tallest bin in a time offset histogram.
+    
+    Args:
+        time_offsets: Non-empty sequence of integer time offset differences
+    
+    Returns:
+        int: Number of offsets in the most common bin
+    """
+    offsets = np.asarray(time_offsets, dtype=np.int64)
+    
+    # Shift offsets to be non-negative so they can be counted with bincount
+    return int(np.bincount(offsets - offsets.min()).max())
+
+
+def _align_matches(query_hashes, query_times, db_hashes, db_times):
+    """
+    Pair every stored match with every query occurrence of its hash.
+    
+    Args:
+        query_hashes: int64 array of query hash values
+        query_times: int64 array of query time offsets
+        db_hashes: int64 array of matched hash values from lookup_hashes
+        db_times: int64 array of matched time offsets from lookup_hashes
+    
+    Returns:
+        tuple: (match_idx, time_deltas) arrays; match_idx indexes the
+            lookup_hashes arrays and time_deltas is db_time - query_time
+    """
+    # Sort the query by hash so each stored match finds its query rows
+    # as one contiguous range
+    order = np.argsort(query_hashes, kind='stable')
+    sorted_hashes = query_hashes[order]
+    sorted_times = query_times[order]
+    
+    lo = np.searchsorted(sorted_hashes, db_hashes, side='left')
+    counts = np.searchsorted(sorted_hashes, db_hashes, side='right') - lo
+    
+    # Expand each match over its query range
+    match_idx = np.repeat(np.arange(len(db_hashes)), counts)
+    starts = np.cumsum(counts) - counts
+    query_idx = np.repeat(lo - starts, counts) + np.arange(counts.sum())
+    
+    return match_idx, db_times[match_idx] - sorted_times[query_idx]
+
+
+def _max_aligned_numpy(song_idx, time_deltas, num_songs):
+    """
+    Count each song's most common time delta with NumPy.
+    
+    Args:
+        song_idx: int64 array of song indexes, one per aligned match
+        time_deltas: int64 array of time deltas, parallel to song_idx
+        num_songs: Number of distinct songs
+    
+    Returns:
+        np.ndarray: int64 aligned count per song index
+    """
+    # Histogram (song, delta) pairs by encoding them as one integer key;
+    # np.unique counts the non-empty bins without allocating a dense
+    # songs x deltas table
+    deltas = time_deltas - time_deltas.min()
+    span = int(deltas.max()) + 1
+    keys, bin_counts = np.unique(song_idx * span + deltas, return_counts=True)
+    
+    aligned_counts = np.zeros(num_songs, dtype=np.int64)
+    np.maximum.at(aligned_counts, keys // span, bin_counts)
+    
+    return aligned_counts
+
+
+def _max_aligned_loop(song_idx, time_deltas, num_songs):
+    """
+    Count each song's most common time delta with a scalar loop (compiled with numba).
+    
+    Args:
+        song_idx: int64 array of song indexes, one per aligned match
+        time_deltas: int64 array of time deltas, parallel to song_idx
+        num_songs: Number of distinct songs
+    
+    Returns:
+        np.ndarray: int64 aligned count per song index
+    """
+    aligned_counts = np.zeros(num_songs, dtype=np.int64)
+    num_matches = len(song_idx)
+    if num_matches == 0:
+        return aligned_counts
+    
+    min_delta = time_deltas.min()
+    span = time_deltas.max() - min_delta + 1
+    
+    # Counting sort of matches by song, in O(n)
+    song_starts = np.zeros(num_songs + 1, dtype=np.int64)
+    for i in range(num_matches):
+        song_starts[song_idx[i] + 1] += 1
+    for song in range(num_songs):
+        song_starts[song + 1] += song_starts[song]
+    
+    fill = song_starts[:-1].copy()
+    grouped = np.empty(num_matches, dtype=np.int64)
+    for i in range(num_matches):
+        grouped[fill[song_idx[i]]] = time_deltas[i] - min_delta
+        fill[song_idx[i]] += 1
+    
+    # Histogram one song at a time in a single reused row, clearing only
+    # the bins that song touched
+    histogram = np.zeros(span, dtype=np.int64)
+    for song in range(num_songs):
+        best = 0
+        for k in range(song_starts[song], song_starts[song + 1]):
+            histogram[grouped[k]] += 1
+            if histogram[grouped[k]] > best:
+                best = histogram[grouped[k]]
+        for k in range(song_starts[song], song_starts[song + 1]):
+            histogram[grouped[k]] = 0
+        aligned_counts[song] = best
+    
+    return aligned_counts
+
+
+if njit is not None:
+    _max_aligned_numba = njit(nogil=True, cache=True)(_max_aligned_loop)
+else:
+    _max_aligned_numba = None
+
+
+def _score_songs(song_ids, time_deltas):
+    """
+    Count each song's most common time delta.
+    
+    Args:
+        song_ids: Array of song IDs, one per aligned match
+        time_deltas: int64 array of time deltas, parallel to song_ids
+    
+    Returns:
+        tuple: (songs, aligned_counts) arrays
+    """
+    if len(song_ids) == 0:
+        return np.empty(0, dtype=str), np.empty(0, dtype=np.int64)
+    
+    songs, song_idx = np.unique(song_ids, return_inverse=True)
+    song_idx = song_idx.astype(np.int64).ravel()
+    
+    # Use the compiled kernel when numba is installed
+    if _max_aligned_numba is not None:
+        aligned_counts = _max_aligned_numba(song_idx, time_deltas, len(songs))
+    else:
+        aligned_counts = _max_aligned_numpy(song_idx, time_deltas, len(songs))
+    
+    return songs, aligned_counts
+
+
+# Time deltas are differences of int32 offsets, so they fit in 33 bits once
+# shifted to be non-negative; (song, delta) pairs are packed into one key
+DELTA_BITS = 33
+DELTA_OFFSET = 1 << 32
+
+
+def _update_aligned_counts(song_idx, time_deltas, pair_counts, song_best):
+    """
+    Add a batch of aligned matches to running per-song delta histograms.
+    
+    Args:
+        song_idx: int64 array of song indexes, one per aligned match
+        time_deltas: int64 array of time deltas, parallel to song_idx
+        pair_counts: Dictionary of packed (song, delta) key -> count,
+            updated in place
+        song_best: Dictionary of song index -> tallest bin, updated in place
+    
+    Returns:
+        int: Tallest bin among those this batch touched
+    """
+    keys, batch_counts = np.unique(
+        (song_idx << DELTA_BITS) + (time_deltas + DELTA_OFFSET), return_counts=True
+    )
+    
+    best = 0
+    for key, count in zip(keys.tolist(), batch_counts.tolist()):
+        count += pair_counts.get(key, 0)
+        pair_counts[key] = count
+        
+        song = key >> DELTA_BITS
+        if count > song_best.get(song, 0):
+            song_best[song] = count
+        best = max(best, count)
+    
+    return best
+
+
+def _match_batches(hash_values, query_times, db_store, early_exit_threshold,
+                   batch_size, min_hashes):
+    """
+    Look up and score the query in batches, stopping once a candidate is clearly aligned.
+    
+    Each batch only updates running (song, delta) counts, so the work per
+    batch does not grow with the number of batches already scored.
+    
+    Args:
+        hash_values: int64 array of query hash values
+        query_times: int64 array of query time offsets
+        db_store: Storage backend instance
+        early_exit_threshold: Aligned fraction that ends matching early
+        batch_size: Hashes per lookup batch
+        min_hashes: Minimum hashes to look up before exiting early
+    
+    Returns:
+        tuple: (songs, aligned_counts, num_queried); songs are sorted by
+            song ID as in _score_songs
+    """
+    song_index = {}
+    pair_counts = {}
+    song_best = {}
+    best = 0
+    num_queried = 0
+    
+    for start in range(0, len(hash_values), batch_size):
+        batch_hashes = hash_values[start:start + batch_size]
+        db_hashes, db_songs, db_times = db_store.lookup_hashes(batch_hashes.tolist())
+        
+        match_idx, time_deltas = _align_matches(
+            batch_hashes, query_times[start:start + batch_size], db_hashes, db_times
+        )
+        num_queried += len(batch_hashes)
+        
+        if len(match_idx):
+            # Map this batch's song IDs onto indexes shared by all batches
+            batch_songs, inverse = np.unique(db_songs[match_idx], return_inverse=True)
+            batch_idx = np.array(
+                [song_index.setdefault(song_id, len(song_index)) for song_id in batch_songs.tolist()],
+                dtype=np.int64
+            )
+            best = max(best, _update_aligned_counts(
+                batch_idx[inverse.ravel()], time_deltas, pair_counts, song_best
+            ))
+        
+        # Stop once the best candidate is clearly aligned
+        if num_queried >= min_hashes and best > early_exit_threshold * num_queried:
+            break
+    
+    songs = np.array(list(song_index), dtype=str)
+    aligned_counts = np.array([song_best[idx] for idx in range(len(songs))], dtype=np.int64)
+    
+    order = np.argsort(songs, kind='stable')
+    return songs[order], aligned_counts[order], num_queried
+
+
+def match_fingerprint(query_hashes, db_store, top_k=5, early_exit_threshold=None,
+                      batch_size=500, min_hashes=2000):
     """
     Match query fingerprints against database and score candidates.
     
+    With early_exit_threshold set, hashes are looked up in batches and
+    matching stops once the best candidate's aligned count exceeds
+    early_exit_threshold times the number of hashes looked up so far.
+    
     Args:
-        query_hashes: List of (hash_value, time_offset, None) tuples
+        query_hashes: (hash_values, time_offsets, None) tuple from generate_hashes
         db_store: Storage backend instance
         top_k: Number of top matches to return
+        early_exit_threshold: Aligned fraction that ends matching early
+            (optional; all hashes are looked up when None)
+        batch_size: Hashes per lookup batch when exiting early
+        min_hashes: Minimum hashes to look up before exiting early
     
     Returns:
-        list: List of (song_id, confidence_score, metadata) tuples
+        list: List of (song_id, confidence_score, metadata) tuples; empty
+            when the query has no hashes or the store holds none
     """
-    # Group matches by song_id
-    candidate_matches = defaultdict(list)
+    hash_values, query_times, _ = query_hashes
     
-    # Query database for each hash
-    for hash_value, query_time, _ in query_hashes:
-        matches = db_store.query_hash(hash_value)
-        
-        # matches: list of (song_id, db_time)
-        for song_id, db_time in matches:
-            # Calculate time offset difference
-            time_offset = db_time - query_time
-            candidate_matches[song_id].append(time_offset)
+    # Nothing can match an empty query or an empty in-memory store
+    if len(hash_values) == 0 or getattr(db_store, 'total_hashes', None) == 0:
+        return []
     
-    # Score each candidate song
-    scored_matches = []
-    total_query_hashes = len(query_hashes)
+    hash_values = np.asarray(hash_values, dtype=np.int64)
+    query_times = np.asarray(query_times, dtype=np.int64)
     
-    for song_id, time_offsets in candidate_matches.items():
-        # Create histogram of time offsets
-        offset_histogram = Counter(time_offsets)
-        
-        # Score is the max aligned peak count
-        max_aligned_peaks = max(offset_histogram.values())
+    if early_exit_threshold is None:
+        # Query database for all hashes in one batch
+        db_hashes, db_songs, db_times = db_store.lookup_hashes(hash_values.tolist())
+        match_idx, time_deltas = _align_matches(hash_values, query_times, db_hashes, db_times)
         
-        # Normalize by query hash count
-        confidence_score = max_aligned_peaks / total_query_hashes if total_query_hashes > 0 else 0
+        # Score is the max aligned count per song
+        songs, aligned_counts = _score_songs(db_songs[match_idx], time_deltas)
+        num_queried = len(hash_values)
+    else:
+        songs, aligned_counts, num_queried = _match_batches(
+            hash_values, query_times, db_store, early_exit_threshold, batch_size, min_hashes
+        )
+    
+    # Keep the top K by score; metadata is only fetched for those
+    top = np.argsort(-aligned_counts, kind='stable')[:top_k]
+    
+    scored_matches = []
+    for song_id, max_aligned_peaks in zip(songs[top].tolist(), aligned_counts[top].tolist()):
+        # Normalize by the number of query hashes looked up
+        confidence_score = max_aligned_peaks / num_queried
         
-        # Get song metadata
         metadata = db_store.get_song_metadata(song_id)
         
         scored_matches.append((song_id, confidence_score, metadata))
     
-    # Sort by confidence score (descending)
-    scored_matches.sort(key=lambda x: x[1], reverse=True)
-    
-    # Return top K matches
-    return scored_matches[:top_k]
+    return scored_matches
 
 
 def calculate_match_score(time_offsets, total_query_hashes):
@@ -65,14 +325,11 @@ def calculate_match_score(time_offsets, total_query_hashes):
     Returns:
         float: Confidence score (0-1)
     """
-    if not time_offsets or total_query_hashes == 0:
+    if len(time_offsets) == 0 or total_query_hashes == 0:
         return 0.0
     
-    # Create histogram
-    histogram = Counter(time_offsets)
-    
     # Get maximum aligned peaks
-    max_count = max(histogram.values())
+    max_count = _max_aligned_count(time_offsets)
     
     # Normalize
     score = max_count / total_query_hashes
@@ -2,12 +2,14 @@
 
 from .base import StorageBackend
 from .memory_store import MemoryStore
+from .mmap_store import MmapStore
 from .sqlite_store import SQLiteStore
 from .postgres_store import PostgresStore
 
 __all__ = [
     'StorageBackend',
     'MemoryStore',
+    'MmapStore',
     'SQLiteStore',
     'PostgresStore',
 ]
@@ -2,22 +2,104 @@
 
 from abc import ABC, abstractmethod
 
+import numpy as np
+
+
+def _match_arrays(rows):
+    """
+    Convert (hash_value, song_id, time_offset) rows to lookup_hashes arrays.
+    
+    Args:
+        rows: Iterable of (hash_value, song_id, time_offset) tuples
+    
+    Returns:
+        tuple: (hash_values, song_ids, time_offsets) arrays
+    """
+    rows = list(rows)
+    if not rows:
+        return (
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=str),
+            np.empty(0, dtype=np.int64)
+        )
+    
+    hash_values, song_ids, time_offsets = zip(*rows)
+    return (
+        np.array(hash_values, dtype=np.int64),
+        np.array(song_ids, dtype=str),
+        np.array(time_offsets, dtype=np.int64)
+    )
+
+
+def _fingerprint_arrays(hash_values, time_offsets):
+    """
+    Convert one song's fingerprints to parallel NumPy arrays.
+    
+    Args:
+        hash_values: Array of hash integers
+        time_offsets: Array of anchor time offsets, parallel to hash_values
+    
+    Returns:
+        tuple: (hash_values, time_offsets) as int64 and int32 arrays
+    
+    Raises:
+        ValueError: If the two arrays are not the same 1-D shape
+    """
+    hash_values = np.asarray(hash_values, dtype=np.int64)
+    time_offsets = np.asarray(time_offsets, dtype=np.int32)
+    
+    if hash_values.ndim != 1 or hash_values.shape != time_offsets.shape:
+        raise ValueError(
+            f"hash_values and time_offsets must be parallel 1-D arrays, "
+            f"got shapes {hash_values.shape} and {time_offsets.shape}"
+        )
+    
+    return hash_values, time_offsets
+
 
 class StorageBackend(ABC):
     """Abstract base class for storage backends."""
     
     @abstractmethod
-    def store_fingerprint(self, song_id, song_metadata, hashes):
+    def store_fingerprint(self, song_id, song_metadata, hash_values, time_offsets):
         """
         Store fingerprint hashes for a song.
         
         Args:
             song_id: Unique song identifier
             song_metadata: Dictionary with song metadata (title, artist, etc.)
-            hashes: List of (hash_value, time_offset, song_id) tuples
+            hash_values: Array of hash integers from generate_hashes
+            time_offsets: Array of anchor time offsets, parallel to hash_values
+        """
+        pass
+    
+    def store_fingerprints(self, songs):
+        """
+        Store several songs at once.
+        
+        Backends should override this to write the whole batch in one
+        transaction; the default stores one song at a time.
+        
+        Args:
+            songs: Iterable of (song_id, song_metadata, hash_values,
+                time_offsets) tuples, as passed to store_fingerprint
+        """
+        for song_id, song_metadata, hash_values, time_offsets in songs:
+            self.store_fingerprint(song_id, song_metadata, hash_values, time_offsets)
+    
+    def begin_bulk_load(self):
+        """
+        Prepare for a large batch of writes.
+        
+        Backends may relax durability or defer maintenance until
+        end_bulk_load(); the default does nothing.
         """
         pass
     
+    def end_bulk_load(self):
+        """Restore normal settings and run deferred maintenance after a bulk load."""
+        pass
+    
     @abstractmethod
     def query_hash(self, hash_value):
         """
@@ -31,6 +113,48 @@ class StorageBackend(ABC):
         """
         pass
     
+    def query_hashes(self, hash_values):
+        """
+        Query database for many hashes at once.
+        
+        Backends should override this with a single batched lookup; the
+        default falls back to one query_hash call per hash.
+        
+        Args:
+            hash_values: Iterable of hash integers
+        
+        Returns:
+            dict: hash_value -> list of (song_id, time_offset) tuples.
+                Hashes with no matches may be omitted.
+        """
+        results = {}
+        for hash_value in set(hash_values):
+            matches = self.query_hash(hash_value)
+            if matches:
+                results[hash_value] = matches
+        return results
+    
+    def lookup_hashes(self, hash_values):
+        """
+        Look up many hashes at once and return the matches as flat arrays.
+        
+        Used by the matcher, which aligns and scores matches with NumPy.
+        The default flattens the query_hashes result.
+        
+        Args:
+            hash_values: List of hash integers
+        
+        Returns:
+            tuple: (hash_values, song_ids, time_offsets) arrays with one
+                entry per stored (hash, song, offset) match
+        """
+        matches_by_hash = self.query_hashes(hash_values)
+        return _match_arrays(
+            (hash_value, song_id, time_offset)
+            for hash_value, matches in matches_by_hash.items()
+            for song_id, time_offset in matches
+        )
+    
     @abstractmethod
     def get_song_metadata(self, song_id):
         """
@@ -54,6 +178,18 @@ class StorageBackend(ABC):
         """
         pass
     
+    def iter_songs(self):
+        """
+        Iterate over indexed songs one at a time.
+        
+        Backends should override this to stream rows instead of building
+        the full list; the default iterates over get_all_songs().
+        
+        Returns:
+            iterator: Song metadata dictionaries
+        """
+        return iter(self.get_all_songs())
+    
     @abstractmethod
     def delete_song(self, song_id):
         """
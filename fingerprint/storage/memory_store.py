@@ -1,39 +1,214 @@
-"""In-memory storage backend using Python dictionaries."""
+"""In-memory storage backend using sorted NumPy columns."""
 
-from collections import defaultdict
-from .base import StorageBackend
+import threading
+
+import numpy as np
+
+from .base import StorageBackend, _fingerprint_arrays, _match_arrays
+
+
+# Hashes from generate_hashes fit in 32 bits; the sorted hash column is
+# stored as uint32 whenever every stored hash does
+UINT32_MAX = np.iinfo(np.uint32).max
+
+
+def _expand_ranges(starts, counts):
+    """
+    Concatenate the index ranges [start, start + count) into one array.
+    
+    Args:
+        starts: int64 array of range starts
+        counts: int64 array of range lengths, parallel to starts
+    
+    Returns:
+        np.ndarray: int64 array of indexes covering every range in order
+    """
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+
+
+def _search_hashes(db_hashes, query):
+    """
+    Find the rows holding each query hash in a sorted hash column.
+    
+    Args:
+        db_hashes: Sorted hash column (uint32 or int64)
+        query: int64 array of hash values
+    
+    Returns:
+        tuple: (starts, counts) int64 arrays, parallel to query
+    """
+    if db_hashes.dtype == np.uint32:
+        # Search in the column's own dtype so it is never upcast; hashes
+        # outside the uint32 range cannot be stored and match nothing
+        in_range = (query >= 0) & (query <= UINT32_MAX)
+        query = np.where(in_range, query, 0).astype(np.uint32)
+    else:
+        in_range = None
+    
+    starts = np.searchsorted(db_hashes, query, side='left')
+    counts = np.searchsorted(db_hashes, query, side='right') - starts
+    if in_range is not None:
+        counts[~in_range] = 0
+    
+    return starts, counts
 
 
 class MemoryStore(StorageBackend):
-    """Fast in-memory storage using Python dict."""
+    """Fast in-memory storage using sorted NumPy columns."""
     
     def __init__(self):
         """Initialize memory store."""
-        # Hash table: hash_int -> [(song_id, time_offset), ...]
-        self.hash_table = defaultdict(list)
+        # Pending (song_idx, hash_values, time_offsets) entries; song_idx is
+        # one song's index or an array parallel to hash_values
+        self._pending = []
+        
+        # Finalized index as parallel (hash_values, song_idx, time_offsets)
+        # columns sorted by hash; swapped as one tuple so readers never see
+        # columns from different versions. hash_values is uint32 when every
+        # hash fits, else int64
+        self._columns = (
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int32),
+            np.empty(0, dtype=np.int32)
+        )
+        
+        # Distinct hash count for get_stats, computed on first use after
+        # the columns change
+        self._unique_hashes = 0
+        
+        # Song index <-> song_id mapping used by the compact index
+        self.song_ids = []
+        self.song_index = {}
+        
+        # song_ids as a NumPy string array for lookup_hashes, rebuilt when
+        # songs are added
+        self._song_id_array = np.empty(0, dtype=str)
         
         # Song metadata: song_id -> {title, artist, filepath, ...}
         self.song_metadata = {}
         
         # Track total hashes
         self.total_hashes = 0
+        
+        self._lock = threading.Lock()
+    
+    def _get_song_idx(self, song_id):
+        """Return the integer index for song_id, registering it if new."""
+        song_idx = self.song_index.get(song_id)
+        if song_idx is None:
+            song_idx = len(self.song_ids)
+            self.song_ids.append(song_id)
+            self.song_index[song_id] = song_idx
+        return song_idx
+    
+    def _set_columns(self, hash_values, song_idx, time_offsets):
+        """Install new sorted columns and reset the unique hash count."""
+        # Sorted, so the first and last hashes bound the range
+        if len(hash_values) and hash_values[0] >= 0 and hash_values[-1] <= UINT32_MAX:
+            hash_values = hash_values.astype(np.uint32, copy=False)
+        
+        self._columns = (hash_values, song_idx, time_offsets)
+        self._unique_hashes = None
     
-    def store_fingerprint(self, song_id, song_metadata, hashes):
+    def store_fingerprint(self, song_id, song_metadata, hash_values, time_offsets):
         """
         Store fingerprint hashes for a song.
         
+        Hashes are buffered as whole arrays until finalize() merges them into
+        the sorted columns; queries finalize automatically.
+        
         Args:
             song_id: Unique song identifier
             song_metadata: Dictionary with song metadata
-            hashes: List of (hash_value, time_offset, song_id) tuples
+            hash_values: Array of hash integers from generate_hashes
+            time_offsets: Array of anchor time offsets, parallel to hash_values
+        """
+        hash_values, time_offsets = _fingerprint_arrays(hash_values, time_offsets)
+        
+        with self._lock:
+            # Store metadata
+            self.song_metadata[song_id] = song_metadata
+            song_idx = self._get_song_idx(song_id)
+            
+            # Store hashes
+            self._pending.append((song_idx, hash_values, time_offsets))
+            self.total_hashes += len(hash_values)
+    
+    def finalize(self):
+        """Merge pending hash entries into the sorted columns."""
+        with self._lock:
+            if not self._pending:
+                return
+            
+            hash_values, song_idx, time_offsets = self._columns
+            
+            # Existing columns go first so the stable sort keeps each hash's
+            # entries in insertion order; a uint32 hash column is widened
+            # back to int64 here
+            hash_values = np.concatenate([hash_values] + [hashes for _, hashes, _ in self._pending])
+            song_idx = np.concatenate([song_idx] + [
+                np.broadcast_to(np.asarray(idx, dtype=np.int32), hashes.shape)
+                for idx, hashes, _ in self._pending
+            ])
+            time_offsets = np.concatenate([time_offsets] + [offsets for _, _, offsets in self._pending])
+            self._pending.clear()
+            
+            order = np.argsort(hash_values, kind='stable')
+            self._set_columns(hash_values[order], song_idx[order], time_offsets[order])
+    
+    def to_arrays(self):
+        """
+        Return the index as parallel NumPy columns for saving.
+        
+        Returns:
+            dict: song_ids, song_metadata and the hash_values (uint32 or
+                int64), song_idx (int32) and time_offsets (int32) columns
         """
-        # Store metadata
-        self.song_metadata[song_id] = song_metadata
+        self.finalize()
         
-        # Store hashes
-        for hash_value, time_offset, _ in hashes:
-            self.hash_table[hash_value].append((song_id, time_offset))
-            self.total_hashes += 1
+        with self._lock:
+            hash_values, song_idx, time_offsets = self._columns
+            return {
+                'song_ids': list(self.song_ids),
+                'song_metadata': dict(self.song_metadata),
+                'hash_values': hash_values,
+                'song_idx': song_idx,
+                'time_offsets': time_offsets
+            }
+    
+    def load_arrays(self, song_ids, song_metadata, hash_values, song_idx, time_offsets):
+        """
+        Replace the contents of the store with columns from to_arrays().
+        
+        Args:
+            song_ids: List of song IDs; song_idx values index into it
+            song_metadata: Dictionary of song_id -> metadata
+            hash_values: Array of hash integers
+            song_idx: Array of song indexes, parallel to hash_values
+            time_offsets: Array of time offsets, parallel to hash_values
+        """
+        self.clear()
+        
+        hash_values = np.asarray(hash_values, dtype=np.int64)
+        
+        with self._lock:
+            for song_id in song_ids:
+                self._get_song_idx(song_id)
+            self.song_metadata.update(song_metadata)
+            
+            self._pending.append((
+                np.asarray(song_idx, dtype=np.int32),
+                hash_values,
+                np.asarray(time_offsets, dtype=np.int32)
+            ))
+            self.total_hashes = len(hash_values)
+        
+        self.finalize()
+    
+    def end_bulk_load(self):
+        """Build the sorted columns once, rather than on the first query."""
+        self.finalize()
     
     def query_hash(self, hash_value):
         """
@@ -45,7 +220,70 @@ class MemoryStore(StorageBackend):
         Returns:
             list: List of (song_id, time_offset) tuples
         """
-        return self.hash_table.get(hash_value, [])
+        if self._pending:
+            self.finalize()
+        
+        hash_values, song_idx, time_offsets = self._columns
+        starts, counts = _search_hashes(hash_values, np.array([hash_value], dtype=np.int64))
+        lo = int(starts[0])
+        hi = lo + int(counts[0])
+        
+        song_ids = self.song_ids
+        return [
+            (song_ids[idx], time_offset)
+            for idx, time_offset in zip(song_idx[lo:hi].tolist(), time_offsets[lo:hi].tolist())
+        ]
+    
+    def query_hashes(self, hash_values):
+        """
+        Query database for many hashes at once.
+        
+        Args:
+            hash_values: Iterable of hash integers
+        
+        Returns:
+            dict: hash_value -> list of (song_id, time_offset) tuples
+        """
+        matched_hashes, song_ids, time_offsets = self.lookup_hashes(list(hash_values))
+        
+        results = {}
+        for hash_value, song_id, time_offset in zip(
+            matched_hashes.tolist(), song_ids.tolist(), time_offsets.tolist()
+        ):
+            results.setdefault(hash_value, []).append((song_id, time_offset))
+        return results
+    
+    def lookup_hashes(self, hash_values):
+        """
+        Look up many hashes at once and return the matches as flat arrays.
+        
+        Each distinct query hash is located in the sorted hash column with
+        a binary search, and its matches are read as one contiguous slice.
+        
+        Args:
+            hash_values: List of hash integers
+        
+        Returns:
+            tuple: (hash_values, song_ids, time_offsets) arrays
+        """
+        if self._pending:
+            self.finalize()
+        
+        db_hashes, song_idx, time_offsets = self._columns
+        query = np.unique(np.asarray(hash_values, dtype=np.int64))
+        lo, counts = _search_hashes(db_hashes, query)
+        if not counts.any():
+            return _match_arrays(())
+        
+        if len(self._song_id_array) != len(self.song_ids):
+            self._song_id_array = np.array(self.song_ids, dtype=str)
+        
+        rows = _expand_ranges(lo, counts)
+        return (
+            db_hashes[rows].astype(np.int64),
+            self._song_id_array[song_idx[rows]],
+            time_offsets[rows].astype(np.int64)
+        )
     
     def get_song_metadata(self, song_id):
         """
@@ -79,14 +317,19 @@ class MemoryStore(StorageBackend):
         if song_id in self.song_metadata:
             del self.song_metadata[song_id]
         
-        # Remove hashes
-        for hash_value, entries in list(self.hash_table.items()):
-            self.hash_table[hash_value] = [
-                (sid, offset) for sid, offset in entries if sid != song_id
-            ]
-            # Clean up empty entries
-            if not self.hash_table[hash_value]:
-                del self.hash_table[hash_value]
+        song_idx = self.song_index.get(song_id)
+        if song_idx is None:
+            return
+        
+        self.finalize()
+        
+        # Remove hashes; filtering keeps the columns sorted
+        with self._lock:
+            hash_values, song_idxs, time_offsets = self._columns
+            keep = song_idxs != song_idx
+            
+            self.total_hashes -= int(len(keep) - np.count_nonzero(keep))
+            self._set_columns(hash_values[keep], song_idxs[keep], time_offsets[keep])
     
     def get_stats(self):
         """
@@ -95,16 +338,37 @@ class MemoryStore(StorageBackend):
         Returns:
             dict: Statistics
         """
+        if self._pending:
+            self.finalize()
+        
+        with self._lock:
+            if self._unique_hashes is None:
+                # Equal hashes are adjacent in the sorted column
+                hash_values = self._columns[0]
+                self._unique_hashes = (
+                    int(np.count_nonzero(np.diff(hash_values))) + 1 if len(hash_values) else 0
+                )
+            unique_hashes = self._unique_hashes
+        
         return {
             'total_songs': len(self.song_metadata),
             'total_hashes': self.total_hashes,
-            'unique_hashes': len(self.hash_table),
+            'unique_hashes': unique_hashes,
             'storage_type': 'memory'
         }
     
     def clear(self):
         """Clear all data from storage."""
-        self.hash_table.clear()
-        self.song_metadata.clear()
-        self.total_hashes = 0
+        with self._lock:
+            self._pending.clear()
+            self._set_columns(
+                np.empty(0, dtype=np.int64),
+                np.empty(0, dtype=np.int32),
+                np.empty(0, dtype=np.int32)
+            )
+            self.song_ids.clear()
+            self.song_index.clear()
+            self._song_id_array = np.empty(0, dtype=str)
+            self.song_metadata.clear()
+            self.total_hashes = 0
 
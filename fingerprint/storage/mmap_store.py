@@ -0,0 +1,121 @@
+"""Memory-mapped storage backend persisting MemoryStore's columns to disk."""
+
+import json
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+from .memory_store import MemoryStore
+
+
+class MmapStore(MemoryStore):
+    """
+    MemoryStore whose sorted columns are saved as .npy files.
+    
+    Opening an existing index memory-maps the columns instead of reading
+    them, so startup cost does not grow with the number of hashes; pages
+    are read from disk as lookups touch them. Changes are written back
+    by save(), which end_bulk_load() calls after indexing.
+    """
+    
+    # Column files, in the order of MemoryStore._columns
+    COLUMN_FILES = ('hash_values.npy', 'song_idx.npy', 'time_offsets.npy')
+    
+    # Song IDs, metadata and hash count; written last by save()
+    SONGS_FILE = 'songs.json'
+    
+    def __init__(self, index_dir='fingerprint_index'):
+        """
+        Initialize memory-mapped store.
+        
+        Args:
+            index_dir: Directory holding the saved index; loaded if it
+                already contains one
+        """
+        super().__init__()
+        self.index_dir = index_dir
+        
+        if os.path.exists(os.path.join(index_dir, self.SONGS_FILE)):
+            self._load()
+    
+    def _load(self):
+        """Memory-map the saved columns and read the song table."""
+        with open(os.path.join(self.index_dir, self.SONGS_FILE), 'r', encoding='utf-8') as f:
+            songs = json.load(f)
+        
+        columns = [
+            np.load(os.path.join(self.index_dir, name), mmap_mode='r')
+            for name in self.COLUMN_FILES
+        ]
+        if any(len(column) != songs['total_hashes'] for column in columns):
+            raise ValueError(
+                f"Index in {self.index_dir} is incomplete; save it again or re-index"
+            )
+        
+        with self._lock:
+            for song_id in songs['song_ids']:
+                self._get_song_idx(song_id)
+            self.song_metadata.update(songs['song_metadata'])
+            self.total_hashes = songs['total_hashes']
+            self._set_columns(*columns)
+    
+    def save(self):
+        """
+        Write the index to index_dir.
+        
+        Each file is written under a temporary name and then renamed over
+        the old one, so memory maps of the previous files stay valid.
+        """
+        self.finalize()
+        
+        with self._lock:
+            columns = self._columns
+            songs = {
+                'song_ids': list(self.song_ids),
+                'song_metadata': dict(self.song_metadata),
+                'total_hashes': self.total_hashes
+            }
+        
+        os.makedirs(self.index_dir, exist_ok=True)
+        
+        for name, column in zip(self.COLUMN_FILES, columns):
+            with self._replacing(name) as f:
+                np.save(f, column)
+        
+        with self._replacing(self.SONGS_FILE) as f:
+            f.write(json.dumps(songs).encode('utf-8'))
+    
+    @contextmanager
+    def _replacing(self, name):
+        """
+        Write a file in index_dir through a temporary file.
+        
+        Args:
+            name: File name inside index_dir
+        
+        Yields:
+            file: Binary file to write; renamed over name on success
+        """
+        path = os.path.join(self.index_dir, name)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            yield f
+        os.replace(tmp_path, path)
+    
+    def end_bulk_load(self):
+        """Build the sorted columns and save them after a bulk load."""
+        self.save()
+    
+    def get_stats(self):
+        """
+        Get database statistics.
+        
+        Returns:
+            dict: Statistics
+        """
+        stats = super().get_stats()
+        stats['storage_type'] = 'mmap'
+        stats['index_dir'] = self.index_dir
+        return stats
+
@@ -1,14 +1,37 @@
 """PostgreSQL storage backend (optional)."""
 
+import csv
+import io
 import json
-from .base import StorageBackend
+import weakref
+from collections import defaultdict
+from itertools import repeat
+from contextlib import contextmanager
+
+from .base import StorageBackend, _fingerprint_arrays, _match_arrays
 
 
 class PostgresStore(StorageBackend):
     """PostgreSQL storage backend for large-scale deployments."""
     
+    # Rows per multi-row INSERT when COPY is disabled
+    INSERT_PAGE_SIZE = 10000
+    
+    # Rows fetched per round trip by iter_songs
+    ITER_SONGS_CHUNK = 2000
+    
+    # Lookups prepared once per pooled connection
+    PREPARED_STATEMENTS = (
+        '''PREPARE query_hash_ps(BIGINT) AS
+            SELECT song_id, time_offset FROM fingerprints WHERE hash_value = $1''',
+        '''PREPARE query_hashes_ps(BIGINT[]) AS
+            SELECT hash_value, song_id, time_offset FROM fingerprints
+            WHERE hash_value = ANY($1)''',
+    )
+    
     def __init__(self, host='localhost', port=5432, database='fingerprint',
-                 user='fingerprint_user', password=''):
+                 user='fingerprint_user', password='', use_copy=True,
+                 max_connections=8):
         """
         Initialize PostgreSQL store.
         
@@ -18,7 +41,11 @@ class PostgresStore(StorageBackend):
             database: Database name
             user: Database user
             password: Database password
+            use_copy: Bulk-load fingerprints with COPY; when False, use
+                multi-row INSERTs (e.g. when the table has triggers)
+            max_connections: Maximum number of pooled connections
         """
+        self.use_copy = use_copy
         self.connection_params = {
             'host': host,
             'port': port,
@@ -30,66 +57,144 @@ class PostgresStore(StorageBackend):
         # Note: psycopg2 import is optional
         try:
             import psycopg2
+            import psycopg2.extras
+            import psycopg2.pool
             self.psycopg2 = psycopg2
-            self._init_database()
         except ImportError:
             raise ImportError(
                 "psycopg2 is required for PostgreSQL support. "
                 "Install with: pip install psycopg2-binary"
             )
+        
+        # Reuse connections across calls and threads; the pool keeps one
+        # idle connection and closes the others when they are returned, so
+        # per-connection state must not outlive its connection
+        self.pool = psycopg2.pool.ThreadedConnectionPool(
+            1, max_connections, **self.connection_params
+        )
+        # Connections that already hold the prepared statements; the pool
+        # closes connections returned beyond its minimum, so entries are
+        # weak and go away with the connection
+        self._prepared_connections = weakref.WeakSet()
+        self._init_database()
     
-    def _get_connection(self):
-        """Get database connection."""
-        return self.psycopg2.connect(**self.connection_params)
-    
-    def _init_database(self):
-        """Create database tables if they don't exist."""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+    @contextmanager
+    def _connection(self, prepare=True):
+        """
+        Borrow a pooled connection for one transaction.
         
-        # Songs table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS songs (
-                song_id TEXT PRIMARY KEY,
-                title TEXT,
-                artist TEXT,
-                filepath TEXT,
-                duration REAL,
-                metadata JSONB
-            )
-        ''')
+        Commits on success and rolls back on error, so connections go back
+        to the pool idle rather than inside an open transaction.
         
-        # Fingerprints table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS fingerprints (
-                hash_value BIGINT,
-                song_id TEXT,
-                time_offset INTEGER,
-                FOREIGN KEY (song_id) REFERENCES songs(song_id)
-            )
-        ''')
+        Args:
+            prepare: Prepare the lookup statements on the connection first
+                (disabled while the tables may not exist yet)
+        """
+        conn = self.pool.getconn()
+        try:
+            if prepare:
+                self._prepare_statements(conn)
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+    
+    def _prepare_statements(self, conn):
+        """
+        Prepare the lookup statements on a connection the first time it is used.
         
-        # Create index on hash_value for fast lookups
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_hash_value 
-            ON fingerprints(hash_value)
-        ''')
+        Args:
+            conn: Pooled database connection
+        """
+        if conn in self._prepared_connections:
+            return
         
+        cursor = conn.cursor()
+        for statement in self.PREPARED_STATEMENTS:
+            cursor.execute(statement)
         conn.commit()
-        cursor.close()
-        conn.close()
+        self._prepared_connections.add(conn)
     
-    def store_fingerprint(self, song_id, song_metadata, hashes):
+    def close(self):
+        """Close all pooled connections."""
+        self.pool.closeall()
+        self._prepared_connections.clear()
+    
+    def _init_database(self):
+        """Create database tables if they don't exist."""
+        with self._connection(prepare=False) as conn:
+            cursor = conn.cursor()
+            
+            # Songs table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS songs (
+                    song_id TEXT PRIMARY KEY,
+                    title TEXT,
+                    artist TEXT,
+                    filepath TEXT,
+                    duration REAL,
+                    metadata JSONB
+                )
+            ''')
+            
+            # Fingerprints table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    hash_value BIGINT,
+                    song_id TEXT,
+                    time_offset INTEGER,
+                    FOREIGN KEY (song_id) REFERENCES songs(song_id)
+                )
+            ''')
+            
+            # Create index on hash_value for fast lookups
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_hash_value 
+                ON fingerprints(hash_value)
+            ''')
+    
+    def store_fingerprint(self, song_id, song_metadata, hash_values, time_offsets):
         """
         Store fingerprint hashes for a song.
         
         Args:
             song_id: Unique song identifier
             song_metadata: Dictionary with song metadata
-            hashes: List of (hash_value, time_offset, song_id) tuples
+            hash_values: Array of hash integers from generate_hashes
+            time_offsets: Array of anchor time offsets, parallel to hash_values
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        with self._connection() as conn:
+            self._insert_song(conn.cursor(), song_id, song_metadata, hash_values, time_offsets)
+    
+    def store_fingerprints(self, songs):
+        """
+        Store several songs in a single transaction.
+        
+        Args:
+            songs: Iterable of (song_id, song_metadata, hash_values,
+                time_offsets) tuples
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            for song_id, song_metadata, hash_values, time_offsets in songs:
+                self._insert_song(cursor, song_id, song_metadata, hash_values, time_offsets)
+    
+    def _insert_song(self, cursor, song_id, song_metadata, hash_values, time_offsets):
+        """
+        Insert one song's metadata and fingerprints inside an open transaction.
+        
+        Args:
+            cursor: Cursor inside an open transaction
+            song_id: Unique song identifier
+            song_metadata: Dictionary with song metadata
+            hash_values: Array of hash integers
+            time_offsets: Array of anchor time offsets
+        """
+        # Validate before writing anything
+        hash_values, time_offsets = _fingerprint_arrays(hash_values, time_offsets)
         
         # Store song metadata
         cursor.execute('''
@@ -108,22 +213,96 @@ class PostgresStore(StorageBackend):
             song_metadata.get('artist', ''),
             song_metadata.get('filepath', ''),
             song_metadata.get('duration', 0.0),
-            json.dumps(song_metadata)
+            self.psycopg2.extras.Json(song_metadata)
         ))
         
-        # Store fingerprints
-        fingerprint_data = [
-            (hash_value, song_id, time_offset)
-            for hash_value, time_offset, _ in hashes
-        ]
-        cursor.executemany('''
-            INSERT INTO fingerprints (hash_value, song_id, time_offset)
-            VALUES (%s, %s, %s)
-        ''', fingerprint_data)
+        # Store fingerprints, streaming rows to the driver without
+        # building an intermediate list of tuples
+        fingerprint_data = zip(hash_values.tolist(), repeat(song_id), time_offsets.tolist())
+        if self.use_copy:
+            self._copy_fingerprints(cursor, fingerprint_data)
+        else:
+            self.psycopg2.extras.execute_values(
+                cursor,
+                'INSERT INTO fingerprints (hash_value, song_id, time_offset) VALUES %s',
+                fingerprint_data,
+                page_size=self.INSERT_PAGE_SIZE
+            )
+    
+    def _copy_fingerprints(self, cursor, fingerprint_data):
+        """
+        Load fingerprint rows with a single COPY.
         
-        conn.commit()
-        cursor.close()
-        conn.close()
+        Args:
+            cursor: Open database cursor
+            fingerprint_data: Iterable of (hash_value, song_id, time_offset) rows
+        """
+        # CSV quoting keeps arbitrary song_id strings safe
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(fingerprint_data)
+        buffer.seek(0)
+        cursor.copy_expert('''
+            COPY fingerprints (hash_value, song_id, time_offset)
+            FROM STDIN WITH (FORMAT CSV)
+        ''', buffer)
+    
+    @contextmanager
+    def _autocommit_connection(self):
+        """
+        Borrow a pooled connection in autocommit mode.
+        
+        For statements that cannot run inside a transaction block, such as
+        VACUUM and CREATE INDEX CONCURRENTLY.
+        """
+        conn = self.pool.getconn()
+        try:
+            conn.autocommit = True
+            yield conn
+        finally:
+            conn.autocommit = False
+            self.pool.putconn(conn)
+    
+    def begin_bulk_load(self):
+        """
+        Drop the hash index and pause autovacuum for the load.
+        
+        Building the index once at the end is a sequential sort rather than
+        a random B-tree insert per row. Hash lookups fall back to sequential
+        scans until end_bulk_load() runs.
+        """
+        with self._connection(prepare=False) as conn:
+            cursor = conn.cursor()
+            cursor.execute('DROP INDEX IF EXISTS idx_hash_value')
+            cursor.execute(
+                'ALTER TABLE fingerprints SET (autovacuum_enabled = false)'
+            )
+    
+    def end_bulk_load(self):
+        """Rebuild the hash index, re-enable autovacuum and VACUUM ANALYZE once."""
+        with self._connection(prepare=False) as conn:
+            conn.cursor().execute(
+                'ALTER TABLE fingerprints SET (autovacuum_enabled = true)'
+            )
+        
+        with self._autocommit_connection() as conn:
+            cursor = conn.cursor()
+            # CONCURRENTLY lets queries and writes continue during the build
+            cursor.execute('''
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_hash_value
+                ON fingerprints(hash_value)
+            ''')
+            cursor.execute('VACUUM ANALYZE fingerprints')
+    
+    def cluster(self):
+        """
+        Physically order fingerprints by hash_value.
+        
+        Run after bulk indexing so rows for a hash share heap pages.
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('CLUSTER fingerprints USING idx_hash_value')
+            cursor.execute('ANALYZE fingerprints')
     
     def query_hash(self, hash_value):
         """
@@ -135,20 +314,61 @@ class PostgresStore(StorageBackend):
         Returns:
             list: List of (song_id, time_offset) tuples
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('EXECUTE query_hash_ps(%s)', (hash_value,))
+            
+            results = cursor.fetchall()
         
-        cursor.execute('''
-            SELECT song_id, time_offset 
-            FROM fingerprints 
-            WHERE hash_value = %s
-        ''', (hash_value,))
+        return results
+    
+    def _fetch_matches(self, hash_values):
+        """
+        Fetch stored matches for many hashes with one ANY() lookup.
+        
+        Args:
+            hash_values: Iterable of hash integers
         
-        results = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        Returns:
+            list: (hash_value, song_id, time_offset) rows
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('EXECUTE query_hashes_ps(%s)', (list(set(hash_values)),))
+            
+            rows = cursor.fetchall()
+        
+        return rows
+    
+    def query_hashes(self, hash_values):
+        """
+        Query database for many hashes at once.
         
-        return results
+        Args:
+            hash_values: Iterable of hash integers
+        
+        Returns:
+            dict: hash_value -> list of (song_id, time_offset) tuples
+        """
+        results = defaultdict(list)
+        for hash_value, song_id, time_offset in self._fetch_matches(hash_values):
+            results[hash_value].append((song_id, time_offset))
+        
+        return dict(results)
+    
+    def lookup_hashes(self, hash_values):
+        """
+        Look up many hashes at once and return the matches as flat arrays.
+        
+        Args:
+            hash_values: List of hash integers
+        
+        Returns:
+            tuple: (hash_values, song_ids, time_offsets) arrays
+        """
+        return _match_arrays(self._fetch_matches(hash_values))
     
     def get_song_metadata(self, song_id):
         """
@@ -160,16 +380,14 @@ class PostgresStore(StorageBackend):
         Returns:
             dict: Song metadata or None if not found
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT metadata FROM songs WHERE song_id = %s
-        ''', (song_id,))
-        
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT metadata FROM songs WHERE song_id = %s
+            ''', (song_id,))
+            
+            result = cursor.fetchone()
         
         if result:
             return json.loads(result[0]) if isinstance(result[0], str) else result[0]
@@ -182,19 +400,36 @@ class PostgresStore(StorageBackend):
         Returns:
             list: List of song metadata dictionaries
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT metadata FROM songs')
-        results = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT metadata FROM songs')
+            results = cursor.fetchall()
         
         return [
             json.loads(row[0]) if isinstance(row[0], str) else row[0]
             for row in results
         ]
     
+    def iter_songs(self):
+        """
+        Iterate over indexed songs through a server-side cursor.
+        
+        Rows are fetched in chunks of ITER_SONGS_CHUNK, so memory stays
+        bounded however many songs are indexed.
+        
+        Yields:
+            dict: Song metadata
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor(name='iter_songs')
+            cursor.itersize = self.ITER_SONGS_CHUNK
+            
+            cursor.execute('SELECT metadata FROM songs')
+            
+            for (metadata,) in cursor:
+                yield json.loads(metadata) if isinstance(metadata, str) else metadata
+    
     def delete_song(self, song_id):
         """
         Delete a song and its fingerprints.
@@ -202,15 +437,11 @@ class PostgresStore(StorageBackend):
         Args:
             song_id: Song identifier
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM fingerprints WHERE song_id = %s', (song_id,))
-        cursor.execute('DELETE FROM songs WHERE song_id = %s', (song_id,))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('DELETE FROM fingerprints WHERE song_id = %s', (song_id,))
+            cursor.execute('DELETE FROM songs WHERE song_id = %s', (song_id,))
     
     def get_stats(self):
         """
@@ -219,20 +450,17 @@ class PostgresStore(StorageBackend):
         Returns:
             dict: Statistics
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT COUNT(*) FROM songs')
-        total_songs = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM fingerprints')
-        total_hashes = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(DISTINCT hash_value) FROM fingerprints')
-        unique_hashes = cursor.fetchone()[0]
-        
-        cursor.close()
-        conn.close()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT COUNT(*) FROM songs')
+            total_songs = cursor.fetchone()[0]
+            
+            cursor.execute('SELECT COUNT(*) FROM fingerprints')
+            total_hashes = cursor.fetchone()[0]
+            
+            cursor.execute('SELECT COUNT(DISTINCT hash_value) FROM fingerprints')
+            unique_hashes = cursor.fetchone()[0]
         
         return {
             'total_songs': total_songs,
@@ -243,13 +471,9 @@ class PostgresStore(StorageBackend):
     
     def clear(self):
         """Clear all data from storage."""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM fingerprints')
-        cursor.execute('DELETE FROM songs')
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('DELETE FROM fingerprints')
+            cursor.execute('DELETE FROM songs')
 
@@ -2,96 +2,362 @@
 
 import sqlite3
 import json
-from .base import StorageBackend
+import threading
+import weakref
+from functools import lru_cache
+from contextlib import contextmanager
+from collections import defaultdict
+from itertools import chain, repeat
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+from .base import StorageBackend, _fingerprint_arrays, _match_arrays
+
+
+# Metadata is stored as JSON; orjson is several times faster when present
+# and its bytes output is stored as-is (json.loads also accepts bytes)
+if orjson is not None:
+    def _dumps_metadata(metadata):
+        return orjson.dumps(metadata, option=orjson.OPT_SERIALIZE_NUMPY)
+    
+    _loads_metadata = orjson.loads
+else:
+    _dumps_metadata = json.dumps
+    _loads_metadata = json.loads
+
+
+class _ThreadSentinel:
+    """Per-thread marker whose finalizer closes that thread's connection."""
+
+
+def _close_connection(conn, connections, connections_lock):
+    """Close a connection and stop tracking it in connections."""
+    with connections_lock:
+        if conn in connections:
+            connections.remove(conn)
+    conn.close()
 
 
 class SQLiteStore(StorageBackend):
     """SQLite storage backend for persistent fingerprint database."""
     
+    # Stay below SQLite's default limit on bound parameters per statement
+    QUERY_BATCH_SIZE = 900
+    
+    # Per-connection prepared statement cache; the IN-list lookups in
+    # query_hashes have one statement per batch length
+    CACHED_STATEMENTS = 512
+    
+    # Serialized metadata values kept per store by get_song_metadata
+    METADATA_CACHE_SIZE = 4096
+    
+    # Applied to every new connection
+    PRAGMAS = (
+        'PRAGMA busy_timeout=5000',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA temp_store=MEMORY',
+        'PRAGMA cache_size=-65536',
+    )
+    
+    # Applied to file-backed databases only: WAL lets readers run alongside
+    # a writer, and mmap keeps hot index pages out of read() calls
+    FILE_PRAGMAS = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA mmap_size=268435456',
+    )
+    
+    # Applied between begin_bulk_load() and end_bulk_load(); a crash or
+    # power loss mid-load can corrupt the database, so re-index from scratch
+    # if a bulk load is interrupted
+    BULK_LOAD_PRAGMAS = (
+        'PRAGMA synchronous=OFF',
+    )
+    
     def __init__(self, db_path='fingerprint.db'):
         """
         Initialize SQLite store.
         
         Args:
-            db_path: Path to SQLite database file
+            db_path: Path to SQLite database file; ':memory:' gives each
+                thread its own private database, since connections are
+                per-thread
         """
         self.db_path = db_path
-        self._init_database()
+        
+        # One connection per thread, reused across calls and closed when
+        # the thread exits
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._bulk_load = False
+        
+        # Per-instance cache of stored metadata values, cleared whenever
+        # this store writes songs; writes made through other connections
+        # to the same file are not seen for cached songs
+        self._cached_metadata = lru_cache(maxsize=self.METADATA_CACHE_SIZE)(self._fetch_metadata)
+        
+        try:
+            self._init_database()
+        except Exception:
+            self.close()
+            raise
+    
+    def _get_connection(self):
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Only the owning thread uses the connection; close() may run
+            # from another thread, hence check_same_thread=False
+            conn = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                isolation_level=None,
+                cached_statements=self.CACHED_STATEMENTS
+            )
+            for pragma in self.PRAGMAS:
+                conn.execute(pragma)
+            if self.db_path != ':memory:':
+                for pragma in self.FILE_PRAGMAS:
+                    conn.execute(pragma)
+            
+            # The sentinel lives only in this thread's local storage, so
+            # it is freed when the thread exits; closing the connection
+            # then keeps short-lived request threads from leaking them
+            self._local.conn = conn
+            self._local.sentinel = _ThreadSentinel()
+            weakref.finalize(
+                self._local.sentinel, _close_connection,
+                conn, self._connections, self._connections_lock
+            )
+            with self._connections_lock:
+                if self._bulk_load:
+                    for pragma in self.BULK_LOAD_PRAGMAS:
+                        conn.execute(pragma)
+                self._connections.append(conn)
+        return conn
+    
+    @contextmanager
+    def _transaction(self):
+        """
+        Run a block of writes as one explicit transaction.
+        
+        Connections run in autocommit mode, so BEGIN IMMEDIATE takes the
+        write lock up front and COMMIT syncs once for the whole block.
+        
+        Yields:
+            sqlite3.Cursor: Cursor on this thread's connection
+        """
+        conn = self._get_connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn.cursor()
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    
+    def begin_bulk_load(self):
+        """
+        Skip fsync on commit until end_bulk_load().
+        
+        Applies to open connections and to any opened during the load (the
+        indexer writes from its own thread).
+        """
+        with self._connections_lock:
+            self._bulk_load = True
+            for conn in self._connections:
+                for pragma in self.BULK_LOAD_PRAGMAS:
+                    conn.execute(pragma)
+    
+    def end_bulk_load(self):
+        """Restore normal durability and refresh planner statistics once."""
+        with self._connections_lock:
+            self._bulk_load = False
+            for conn in self._connections:
+                for pragma in self.PRAGMAS:
+                    conn.execute(pragma)
+        
+        self._get_connection().execute('ANALYZE')
+    
+    def close(self):
+        """Close all connections opened by this store."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
     
     def _init_database(self):
         """Create database tables if they don't exist."""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
-        # Songs table
+        # Databases from before integer song keys are upgraded in place
+        cursor.execute('PRAGMA table_info(songs)')
+        song_columns = {row[1] for row in cursor.fetchall()}
+        if song_columns and 'song_pk' not in song_columns:
+            self._migrate_text_song_keys()
+        
+        self._create_tables(cursor)
+    
+    def _create_tables(self, cursor):
+        """
+        Create the songs and fingerprints tables if they don't exist.
+        
+        Args:
+            cursor: Database cursor
+        """
+        # Songs table; song_pk is the compact key stored with each fingerprint
+        # and metadata holds the whole metadata dict as one JSON blob
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS songs (
-                song_id TEXT PRIMARY KEY,
-                title TEXT,
-                artist TEXT,
-                filepath TEXT,
-                duration REAL,
-                metadata TEXT
+                song_pk INTEGER PRIMARY KEY,
+                song_id TEXT NOT NULL UNIQUE,
+                metadata BLOB
             )
         ''')
         
-        # Fingerprints table
+        # Fingerprints table, clustered on hash_value: a WITHOUT ROWID
+        # table is stored as its primary key B-tree, so a hash lookup reads
+        # the matching rows directly instead of an index and then the heap.
+        # The key also stores a (hash, song, offset) triple only once; a
+        # repeat would only add the same vote twice
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS fingerprints (
                 hash_value INTEGER,
-                song_id TEXT,
+                song_pk INTEGER,
                 time_offset INTEGER,
-                FOREIGN KEY (song_id) REFERENCES songs(song_id)
-            )
-        ''')
-        
-        # Create index on hash_value for fast lookups
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_hash_value 
-            ON fingerprints(hash_value)
+                PRIMARY KEY (hash_value, song_pk, time_offset),
+                FOREIGN KEY (song_pk) REFERENCES songs(song_pk)
+            ) WITHOUT ROWID
         ''')
+    
+    def _migrate_text_song_keys(self):
+        """
+        Upgrade a database keyed by TEXT song_id to integer song keys.
         
-        conn.commit()
-        conn.close()
+        Runs once, in one transaction: the old tables are renamed, their
+        rows copied into the current schema and the old tables dropped.
+        The metadata column already holds each song's JSON metadata.
+        """
+        with self._transaction() as cursor:
+            cursor.execute('ALTER TABLE songs RENAME TO songs_text_keys')
+            cursor.execute('ALTER TABLE fingerprints RENAME TO fingerprints_text_keys')
+            self._create_tables(cursor)
+            
+            cursor.execute('''
+                INSERT INTO songs (song_id, metadata)
+                SELECT song_id, metadata FROM songs_text_keys
+            ''')
+            cursor.execute('''
+                INSERT OR IGNORE INTO fingerprints (hash_value, song_pk, time_offset)
+                SELECT old.hash_value, songs.song_pk, old.time_offset
+                FROM fingerprints_text_keys AS old
+                JOIN songs ON songs.song_id = old.song_id
+            ''')
+            
+            cursor.execute('DROP TABLE fingerprints_text_keys')
+            cursor.execute('DROP TABLE songs_text_keys')
     
-    def store_fingerprint(self, song_id, song_metadata, hashes):
+    def store_fingerprint(self, song_id, song_metadata, hash_values, time_offsets):
         """
         Store fingerprint hashes for a song.
         
         Args:
             song_id: Unique song identifier
             song_metadata: Dictionary with song metadata
-            hashes: List of (hash_value, time_offset, song_id) tuples
+            hash_values: Array of hash integers from generate_hashes
+            time_offsets: Array of anchor time offsets, parallel to hash_values
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        self.store_fingerprints([(song_id, song_metadata, hash_values, time_offsets)])
+    
+    def store_fingerprints(self, songs):
+        """
+        Store several songs in a single transaction.
         
-        # Store song metadata
-        cursor.execute('''
-            INSERT OR REPLACE INTO songs 
-            (song_id, title, artist, filepath, duration, metadata)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            song_id,
-            song_metadata.get('title', ''),
-            song_metadata.get('artist', ''),
-            song_metadata.get('filepath', ''),
-            song_metadata.get('duration', 0.0),
-            json.dumps(song_metadata)
-        ))
-        
-        # Store fingerprints
-        fingerprint_data = [
-            (hash_value, song_id, time_offset)
-            for hash_value, time_offset, _ in hashes
+        Song rows and fingerprint rows each go through one executemany
+        call, however many songs are in the batch. Re-storing a song
+        replaces its fingerprints. Repeated (hash, offset) pairs within a
+        song are stored once, so total_hashes can be lower than
+        MemoryStore's for the same input.
+        
+        Args:
+            songs: Iterable of (song_id, song_metadata, hash_values,
+                time_offsets) tuples
+        """
+        # Validate every song before writing anything
+        songs = [
+            (song_id, song_metadata) + _fingerprint_arrays(hash_values, time_offsets)
+            for song_id, song_metadata, hash_values, time_offsets in songs
         ]
-        cursor.executemany('''
-            INSERT INTO fingerprints (hash_value, song_id, time_offset)
-            VALUES (?, ?, ?)
-        ''', fingerprint_data)
+        if not songs:
+            return
+        
+        with self._transaction() as cursor:
+            # Drop the fingerprints of songs being re-indexed; new songs
+            # have none, so the scan is skipped for them
+            existing_pks = list(
+                self._get_song_pks(cursor, [song_id for song_id, _, _, _ in songs]).values()
+            )
+            for start in range(0, len(existing_pks), self.QUERY_BATCH_SIZE):
+                batch = existing_pks[start:start + self.QUERY_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                cursor.execute(f'DELETE FROM fingerprints WHERE song_pk IN ({placeholders})', batch)
+            
+            # Store song metadata as one serialized value per song; upsert
+            # keeps song_pk stable on re-index
+            cursor.executemany('''
+                INSERT INTO songs (song_id, metadata)
+                VALUES (?, ?)
+                ON CONFLICT (song_id) DO UPDATE
+                SET metadata = excluded.metadata
+            ''', [
+                (song_id, _dumps_metadata(song_metadata))
+                for song_id, song_metadata, _, _ in songs
+            ])
+            
+            song_pks = self._get_song_pks(cursor, [song_id for song_id, _, _, _ in songs])
+            
+            # Store fingerprints, streaming every song's rows to the driver
+            # without building an intermediate list of tuples
+            fingerprint_data = chain.from_iterable(
+                zip(hash_values.tolist(), repeat(song_pks[song_id]), time_offsets.tolist())
+                for song_id, _, hash_values, time_offsets in songs
+            )
+            cursor.executemany('''
+                INSERT OR IGNORE INTO fingerprints (hash_value, song_pk, time_offset)
+                VALUES (?, ?, ?)
+            ''', fingerprint_data)
         
-        conn.commit()
-        conn.close()
+        self._cached_metadata.cache_clear()
+    
+    def _get_song_pks(self, cursor, song_ids):
+        """
+        Look up the integer keys of stored songs.
+        
+        Args:
+            cursor: Database cursor
+            song_ids: List of song identifiers
+        
+        Returns:
+            dict: song_id -> song_pk
+        """
+        unique_ids = list(set(song_ids))
+        song_pks = {}
+        
+        for start in range(0, len(unique_ids), self.QUERY_BATCH_SIZE):
+            batch = unique_ids[start:start + self.QUERY_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            cursor.execute(
+                f'SELECT song_id, song_pk FROM songs WHERE song_id IN ({placeholders})',
+                batch
+            )
+            song_pks.update(cursor.fetchall())
+        
+        return song_pks
     
     def query_hash(self, hash_value):
         """
@@ -103,19 +369,74 @@ class SQLiteStore(StorageBackend):
         Returns:
             list: List of (song_id, time_offset) tuples
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT song_id, time_offset 
+            SELECT songs.song_id, fingerprints.time_offset 
             FROM fingerprints 
-            WHERE hash_value = ?
+            JOIN songs ON songs.song_pk = fingerprints.song_pk
+            WHERE fingerprints.hash_value = ?
         ''', (hash_value,))
         
-        results = cursor.fetchall()
-        conn.close()
+        return cursor.fetchall()
+    
+    def _fetch_matches(self, hash_values):
+        """
+        Fetch stored matches for many hashes in IN-list batches.
+        
+        Args:
+            hash_values: Iterable of hash integers
+        
+        Returns:
+            list: (hash_value, song_id, time_offset) rows
+        """
+        unique_hashes = list(set(hash_values))
+        rows = []
+        
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        for start in range(0, len(unique_hashes), self.QUERY_BATCH_SIZE):
+            batch = unique_hashes[start:start + self.QUERY_BATCH_SIZE]
+            placeholders = ', '.join('?' * len(batch))
+            cursor.execute(f'''
+                SELECT fingerprints.hash_value, songs.song_id, fingerprints.time_offset 
+                FROM fingerprints 
+                JOIN songs ON songs.song_pk = fingerprints.song_pk
+                WHERE fingerprints.hash_value IN ({placeholders})
+            ''', batch)
+            rows.extend(cursor.fetchall())
+        
+        return rows
+    
+    def query_hashes(self, hash_values):
+        """
+        Query database for many hashes at once.
+        
+        Args:
+            hash_values: Iterable of hash integers
+        
+        Returns:
+            dict: hash_value -> list of (song_id, time_offset) tuples
+        """
+        results = defaultdict(list)
+        for hash_value, song_id, time_offset in self._fetch_matches(hash_values):
+            results[hash_value].append((song_id, time_offset))
         
-        return results
+        return dict(results)
+    
+    def lookup_hashes(self, hash_values):
+        """
+        Look up many hashes at once and return the matches as flat arrays.
+        
+        Args:
+            hash_values: List of hash integers
+        
+        Returns:
+            tuple: (hash_values, song_ids, time_offsets) arrays
+        """
+        return _match_arrays(self._fetch_matches(hash_values))
     
     def get_song_metadata(self, song_id):
         """
@@ -127,19 +448,22 @@ class SQLiteStore(StorageBackend):
         Returns:
             dict: Song metadata or None if not found
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Decode on every call so callers never share a cached dict
+        metadata = self._cached_metadata(song_id)
+        if metadata is not None:
+            return _loads_metadata(metadata)
+        return None
+    
+    def _fetch_metadata(self, song_id):
+        """Return a song's stored metadata value, or None if not found."""
+        cursor = self._get_connection().cursor()
         
         cursor.execute('''
             SELECT metadata FROM songs WHERE song_id = ?
         ''', (song_id,))
         
         result = cursor.fetchone()
-        conn.close()
-        
-        if result:
-            return json.loads(result[0])
-        return None
+        return result[0] if result else None
     
     def get_all_songs(self):
         """
@@ -148,14 +472,18 @@ class SQLiteStore(StorageBackend):
         Returns:
             list: List of song metadata dictionaries
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT metadata FROM songs')
-        results = cursor.fetchall()
-        conn.close()
+        return list(self.iter_songs())
+    
+    def iter_songs(self):
+        """
+        Iterate over indexed songs, fetching rows as they are consumed.
         
-        return [json.loads(row[0]) for row in results]
+        Yields:
+            dict: Song metadata
+        """
+        conn = self._get_connection()
+        for (metadata,) in conn.execute('SELECT metadata FROM songs'):
+            yield _loads_metadata(metadata)
     
     def delete_song(self, song_id):
         """
@@ -164,14 +492,14 @@ class SQLiteStore(StorageBackend):
         Args:
             song_id: Song identifier
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM fingerprints WHERE song_id = ?', (song_id,))
-        cursor.execute('DELETE FROM songs WHERE song_id = ?', (song_id,))
-        
-        conn.commit()
-        conn.close()
+        with self._transaction() as cursor:
+            cursor.execute('''
+                DELETE FROM fingerprints
+                WHERE song_pk = (SELECT song_pk FROM songs WHERE song_id = ?)
+            ''', (song_id,))
+            cursor.execute('DELETE FROM songs WHERE song_id = ?', (song_id,))
+        
+        self._cached_metadata.cache_clear()
     
     def get_stats(self):
         """
@@ -180,7 +508,7 @@ class SQLiteStore(StorageBackend):
         Returns:
             dict: Statistics
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         cursor.execute('SELECT COUNT(*) FROM songs')
@@ -192,8 +520,6 @@ class SQLiteStore(StorageBackend):
         cursor.execute('SELECT COUNT(DISTINCT hash_value) FROM fingerprints')
         unique_hashes = cursor.fetchone()[0]
         
-        conn.close()
-        
         return {
             'total_songs': total_songs,
             'total_hashes': total_hashes,
@@ -204,12 +530,9 @@ class SQLiteStore(StorageBackend):
     
     def clear(self):
         """Clear all data from storage."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM fingerprints')
-        cursor.execute('DELETE FROM songs')
+        with self._transaction() as cursor:
+            cursor.execute('DELETE FROM fingerprints')
+            cursor.execute('DELETE FROM songs')
         
-        conn.commit()
-        conn.close()
+        self._cached_metadata.cache_clear()
 
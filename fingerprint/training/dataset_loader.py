@@ -8,6 +8,11 @@ class DatasetLoader:
     
     AUDIO_EXTENSIONS = {'.mp3', '.wav', '.flac', '.m4a', '.ogg', '.aac'}
     
+    def __init__(self):
+        """Initialize dataset loader."""
+        # str.endswith takes a tuple, matching all extensions in one call
+        self._extension_tuple = tuple(self.AUDIO_EXTENSIONS)
+    
     def find_audio_files(self, directory_path, recursive=True):
         """
         Find all audio files in a directory.
@@ -17,23 +22,41 @@ class DatasetLoader:
             recursive: Search recursively in subdirectories
         
         Returns:
-            list: List of audio file paths
+            list: Sorted list of audio file paths
+        """
+        return sorted(self.iter_audio_files(directory_path, recursive=recursive))
+    
+    def iter_audio_files(self, directory_path, recursive=True):
         """
-        audio_files = []
+        Yield audio file paths as the directory walk discovers them.
         
-        if recursive:
-            for root, dirs, files in os.walk(directory_path):
-                for filename in files:
-                    if self._is_audio_file(filename):
-                        filepath = os.path.join(root, filename)
-                        audio_files.append(filepath)
-        else:
-            for filename in os.listdir(directory_path):
-                filepath = os.path.join(directory_path, filename)
-                if os.path.isfile(filepath) and self._is_audio_file(filename):
-                    audio_files.append(filepath)
+        Uses os.scandir, whose entries know their type, so no extra stat()
+        is needed per path. Order follows the walk, not sorted order.
+        Like os.walk, unreadable directories are skipped and symlinked
+        directories are not followed.
+        
+        Args:
+            directory_path: Root directory path
+            recursive: Search recursively in subdirectories
+        
+        Yields:
+            str: Audio file path
+        """
+        extension_tuple = self._extension_tuple
+        pending_dirs = [directory_path]
         
-        return sorted(audio_files)
+        while pending_dirs:
+            try:
+                entries = os.scandir(pending_dirs.pop())
+            except OSError:
+                continue
+            
+            with entries:
+                for entry in entries:
+                    if recursive and entry.is_dir(follow_symlinks=False):
+                        pending_dirs.append(entry.path)
+                    elif entry.name.lower().endswith(extension_tuple) and entry.is_file():
+                        yield entry.path
     
     def _is_audio_file(self, filename):
         """
@@ -45,8 +68,7 @@ class DatasetLoader:
         Returns:
             bool: True if audio file
         """
-        extension = os.path.splitext(filename)[1].lower()
-        return extension in self.AUDIO_EXTENSIONS
+        return filename.lower().endswith(self._extension_tuple)
     
     def load_metadata_from_filename(self, filepath):
         """
@@ -1,17 +1,75 @@
 """Batch song indexing."""
 
 import os
+import queue
+import threading
 import uuid
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from ..core import load_audio, preprocess_audio, Fingerprinter, generate_hashes
+from ..storage import SQLiteStore
 from .dataset_loader import DatasetLoader
 from .progress_tracker import ProgressTracker
 
 
+# Per-process fingerprinter, built once by _init_worker
+_worker_fingerprinter = None
+
+
+def _init_worker(fingerprinter_params):
+    """
+    Build the fingerprinter for a worker process.
+    
+    Args:
+        fingerprinter_params: Keyword arguments for Fingerprinter
+    """
+    global _worker_fingerprinter
+    _worker_fingerprinter = Fingerprinter(**fingerprinter_params)
+
+
+def _fingerprint_file(filepath, sr, fan_value, fingerprinter=None):
+    """
+    Load an audio file and compute its fingerprint hashes.
+    
+    Runs in worker processes, so it only touches picklable inputs and
+    returns plain arrays; storage writes stay in the parent process.
+    
+    Args:
+        filepath: Path to audio file
+        sr: Sample rate
+        fan_value: Number of peaks to pair with each anchor
+        fingerprinter: Fingerprinter to use (defaults to the worker's)
+    
+    Returns:
+        tuple: (duration, num_peaks, hash_values, time_offsets)
+    """
+    if fingerprinter is None:
+        fingerprinter = _worker_fingerprinter
+    
+    # Load audio
+    audio, sr = load_audio(filepath, sr=sr)
+    audio = preprocess_audio(audio)
+    
+    # Calculate duration
+    duration = len(audio) / sr
+    
+    # Generate fingerprint
+    peaks = fingerprinter.generate_fingerprint(audio)
+    
+    # Generate hashes
+    hash_values, time_offsets, _ = generate_hashes(peaks, fan_value=fan_value)
+    
+    return duration, len(peaks[0]), hash_values, time_offsets
+
+
 class Indexer:
     """Batch indexer for songs."""
     
+    # Songs are written in batches of up to this many songs or rows
+    WRITE_BATCH_SONGS = 50
+    WRITE_BATCH_ROWS = 100000
+    
     def __init__(self, storage, sr=11025, n_fft=2048, hop_length=512,
                  peak_neighborhood_size=20, min_amplitude=10, fan_value=5):
         """
@@ -27,16 +85,32 @@ class Indexer:
             fan_value: Number of peaks to pair with each anchor
         """
         self.storage = storage
-        self.fingerprinter = Fingerprinter(
-            sr=sr,
-            n_fft=n_fft,
-            hop_length=hop_length,
-            peak_neighborhood_size=peak_neighborhood_size,
-            min_amplitude=min_amplitude
-        )
+        self.fingerprinter_params = {
+            'sr': sr,
+            'n_fft': n_fft,
+            'hop_length': hop_length,
+            'peak_neighborhood_size': peak_neighborhood_size,
+            'min_amplitude': min_amplitude
+        }
+        self.fingerprinter = Fingerprinter(**self.fingerprinter_params)
         self.sr = sr
         self.fan_value = fan_value
     
+    @contextmanager
+    def bulk_mode(self):
+        """
+        Run a block of indexing with the storage backend in bulk-load mode.
+        
+        Deferred maintenance (e.g. ANALYZE) runs once on exit, even if the
+        block fails. For SQLite this also skips fsync on commit, so an
+        interrupted load should be re-indexed from scratch.
+        """
+        self.storage.begin_bulk_load()
+        try:
+            yield
+        finally:
+            self.storage.end_bulk_load()
+    
     def index_song(self, filepath, song_id=None, metadata=None):
         """
         Index a single song.
@@ -49,45 +123,105 @@ class Indexer:
         Returns:
             tuple: (song_id, success, error_message)
         """
+        # Generate song ID if not provided
+        if song_id is None:
+            song_id = str(uuid.uuid4())
+        
         try:
-            # Generate song ID if not provided
-            if song_id is None:
-                song_id = str(uuid.uuid4())
-            
-            # Load audio
-            audio, sr = load_audio(filepath, sr=self.sr)
-            audio = preprocess_audio(audio)
-            
-            # Calculate duration
-            duration = len(audio) / sr
-            
-            # Generate fingerprint
-            peaks = self.fingerprinter.generate_fingerprint(audio)
-            
-            # Generate hashes
-            hashes = generate_hashes(peaks, song_id=song_id, fan_value=self.fan_value)
-            
-            # Prepare metadata
-            if metadata is None:
-                metadata = {}
-            
-            metadata.update({
-                'song_id': song_id,
-                'filepath': filepath,
-                'filename': os.path.basename(filepath),
-                'duration': duration,
-                'num_peaks': len(peaks),
-                'num_hashes': len(hashes)
-            })
-            
-            # Store in database
-            self.storage.store_fingerprint(song_id, metadata, hashes)
-            
+            duration, num_peaks, hash_values, time_offsets = _fingerprint_file(
+                filepath, self.sr, self.fan_value, fingerprinter=self.fingerprinter
+            )
+            record = self._build_song_record(
+                filepath, duration, num_peaks, hash_values, time_offsets,
+                song_id=song_id, metadata=metadata
+            )
+            self.storage.store_fingerprint(*record)
             return song_id, True, None
         
         except Exception as e:
             return song_id, False, str(e)
     
+    def _build_song_record(self, filepath, duration, num_peaks, hash_values, time_offsets,
+                           song_id=None, metadata=None):
+        """
+        Build the storage record for a fingerprinted song.
+        
+        Args:
+            filepath: Path to audio file
+            duration: Song duration in seconds
+            num_peaks: Number of spectral peaks found
+            hash_values: Array of hash integers
+            time_offsets: Array of anchor time offsets
+            song_id: Optional song ID (auto-generated if None)
+            metadata: Optional metadata dictionary
+        
+        Returns:
+            tuple: (song_id, metadata, hash_values, time_offsets)
+        """
+        # Generate song ID if not provided
+        if song_id is None:
+            song_id = str(uuid.uuid4())
+        
+        # Prepare metadata
+        if metadata is None:
+            metadata = {}
+        
+        metadata.update({
+            'song_id': song_id,
+            'filepath': filepath,
+            'filename': os.path.basename(filepath),
+            'duration': duration,
+            'num_peaks': num_peaks,
+            'num_hashes': len(hash_values)
+        })
+        
+        return song_id, metadata, hash_values, time_offsets
+    
+    def _write_songs(self, write_queue, write_errors):
+        """
+        Drain fingerprinted songs from write_queue and store them in batches.
+        
+        Runs on a single writer thread so the database sees one writer and
+        one transaction per batch. A None item ends the loop.
+        
+        Args:
+            write_queue: Queue of (filepath, song_record) items
+            write_errors: List collecting {'file', 'error'} dicts for songs
+                that could not be stored
+        """
+        done = False
+        while not done:
+            # Block for the first song, then take whatever else is ready
+            batch = []
+            num_rows = 0
+            item = write_queue.get()
+            while item is not None:
+                batch.append(item)
+                num_rows += len(item[1][2])
+                if len(batch) >= self.WRITE_BATCH_SONGS or num_rows >= self.WRITE_BATCH_ROWS:
+                    break
+                try:
+                    item = write_queue.get_nowait()
+                except queue.Empty:
+                    break
+            done = item is None
+            
+            if not batch:
+                continue
+            
+            try:
+                self.storage.store_fingerprints([record for _, record in batch])
+            except Exception:
+                # Retry one by one so a bad song doesn't fail the batch
+                for filepath, record in batch:
+                    try:
+                        self.storage.store_fingerprint(*record)
+                    except Exception as e:
+                        write_errors.append({
+                            'file': filepath,
+                            'error': str(e)
+                        })
+    
     def index_directory(self, directory_path, num_workers=4, progress_callback=None):
         """
         Index all songs in a directory.
@@ -99,70 +233,93 @@ class Indexer:
         
         Returns:
             dict: Indexing results summary
-        """
-        # Load audio files
-        loader = DatasetLoader()
-        audio_files = loader.find_audio_files(directory_path)
         
-        if not audio_files:
-            return {
-                'total': 0,
-                'success': 0,
-                'failed': 0,
-                'errors': []
-            }
+        Raises:
+            ValueError: If storage is an in-memory SQLite database, which
+                the writer thread cannot see
+        """
+        # ':memory:' SQLite databases are private to each thread, so the
+        # writer thread would store into an empty database of its own
+        if isinstance(self.storage, SQLiteStore) and self.storage.db_path == ':memory:':
+            raise ValueError(
+                "index_directory cannot write to an in-memory SQLite database; "
+                "use a database file or MemoryStore"
+            )
         
-        # Initialize progress tracker
-        tracker = ProgressTracker(total=len(audio_files))
+        loader = DatasetLoader()
         
         results = {
-            'total': len(audio_files),
+            'total': 0,
             'success': 0,
             'failed': 0,
             'errors': []
         }
         
-        # Index songs in parallel
-        with ThreadPoolExecutor(max_workers=num_workers) as executor:
-            # Submit all jobs
-            future_to_file = {
-                executor.submit(self.index_song, filepath): filepath
-                for filepath in audio_files
-            }
+        with self.bulk_mode():
+            # Store results from a single writer thread that batches songs
+            # into shared transactions while workers keep fingerprinting
+            write_queue = queue.Queue(maxsize=self.WRITE_BATCH_SONGS * 2)
+            write_errors = []
+            writer = threading.Thread(
+                target=self._write_songs,
+                args=(write_queue, write_errors),
+                daemon=True
+            )
+            writer.start()
             
-            # Process completed jobs
-            for future in as_completed(future_to_file):
-                filepath = future_to_file[future]
-                filename = os.path.basename(filepath)
-                
-                try:
-                    song_id, success, error_msg = future.result()
+            try:
+                # Fingerprint songs in worker processes (the work is CPU-bound
+                # and mostly holds the GIL)
+                with ProcessPoolExecutor(
+                    max_workers=num_workers,
+                    initializer=_init_worker,
+                    initargs=(self.fingerprinter_params,)
+                ) as executor:
+                    # Submit jobs while the directory walk is still running, so
+                    # workers start before every file has been found
+                    future_to_file = {
+                        executor.submit(_fingerprint_file, filepath, self.sr, self.fan_value): filepath
+                        for filepath in loader.iter_audio_files(directory_path)
+                    }
                     
-                    if success:
-                        results['success'] += 1
-                    else:
-                        results['failed'] += 1
-                        results['errors'].append({
-                            'file': filepath,
-                            'error': error_msg
-                        })
+                    results['total'] = len(future_to_file)
+                    tracker = ProgressTracker(total=len(future_to_file))
                     
-                    # Update progress
-                    tracker.update(filename)
-                    
-                    if progress_callback:
-                        progress_callback(
-                            tracker.current,
-                            tracker.total,
-                            filename
-                        )
-                
-                except Exception as e:
-                    results['failed'] += 1
-                    results['errors'].append({
-                        'file': filepath,
-                        'error': str(e)
-                    })
+                    # Process completed jobs
+                    for future in as_completed(future_to_file):
+                        filepath = future_to_file[future]
+                        filename = os.path.basename(filepath)
+                        
+                        try:
+                            record = self._build_song_record(filepath, *future.result())
+                            write_queue.put((filepath, record))
+                            results['success'] += 1
+                        
+                        except Exception as e:
+                            results['failed'] += 1
+                            results['errors'].append({
+                                'file': filepath,
+                                'error': str(e)
+                            })
+                        
+                        # Update progress
+                        tracker.update(filename)
+                        
+                        if progress_callback:
+                            progress_callback(
+                                tracker.current,
+                                tracker.total,
+                                filename
+                            )
+            finally:
+                # Flush pending writes
+                write_queue.put(None)
+                writer.join()
+        
+        # Songs that fingerprinted but could not be stored
+        results['success'] -= len(write_errors)
+        results['failed'] += len(write_errors)
+        results['errors'].extend(write_errors)
         
         return results
 
@@ -6,17 +6,28 @@ import time
 class ProgressTracker:
     """Track progress of indexing operations."""
     
-    def __init__(self, total):
+    BAR_WIDTH = 30
+    
+    def __init__(self, total, min_print_interval=0.1):
         """
         Initialize progress tracker.
         
         Args:
             total: Total number of items
+            min_print_interval: Minimum seconds between console updates
         """
         self.total = total
         self.current = 0
         self.start_time = time.time()
         self.last_update_time = self.start_time
+        self.min_print_interval = min_print_interval
+        self._last_print_time = None
+        
+        # Every possible bar for the default width, indexed by filled cells
+        self._bars = [
+            '[' + '█' * filled + '░' * (self.BAR_WIDTH - filled) + ']'
+            for filled in range(self.BAR_WIDTH + 1)
+        ]
     
     def update(self, item_name=None):
         """
@@ -55,13 +66,24 @@ class ProgressTracker:
             'items_per_sec': self.current / elapsed_time if elapsed_time > 0 else 0
         }
     
-    def print_progress(self, item_name=None):
+    def print_progress(self, item_name=None, force=False):
         """
         Print progress to console.
         
+        Updates closer together than min_print_interval are skipped, except
+        for the final one, so large runs don't flood the terminal.
+        
         Args:
             item_name: Name of current item (optional)
+            force: Print even if the last update was too recent
         """
+        now = time.time()
+        is_complete = self.current >= self.total
+        if (not force and not is_complete and self._last_print_time is not None
+                and now - self._last_print_time < self.min_print_interval):
+            return
+        self._last_print_time = now
+        
         progress = self.get_progress()
         
         progress_bar = self._create_progress_bar(progress['progress_percent'])
@@ -76,10 +98,10 @@ class ProgressTracker:
         
         print(message, end='', flush=True)
         
-        if self.current >= self.total:
+        if is_complete:
             print()  # New line at completion
     
-    def _create_progress_bar(self, percent, width=30):
+    def _create_progress_bar(self, percent, width=BAR_WIDTH):
         """
         Create ASCII progress bar.
         
@@ -90,7 +112,10 @@ class ProgressTracker:
         Returns:
             str: Progress bar string
         """
-        filled = int(width * percent / 100)
+        filled = min(max(int(width * percent / 100), 0), width)
+        if width == self.BAR_WIDTH:
+            return self._bars[filled]
+        
         bar = '█' * filled + '░' * (width - filled)
         return f"[{bar}]"
 
@@ -1,16 +1,30 @@
 """Performance metrics collection."""
 
+import math
+import threading
 import time
 from collections import defaultdict
 
 
+# Slots of a running timing aggregate
+_COUNT, _TOTAL, _MEAN, _M2, _MIN, _MAX = range(6)
+
+
+def _new_aggregate():
+    """Return an empty running aggregate."""
+    return [0, 0.0, 0.0, 0.0, math.inf, -math.inf]
+
+
 class MetricsCollector:
     """Collect and track performance metrics."""
     
     def __init__(self):
         """Initialize metrics collector."""
-        self.metrics = defaultdict(list)
+        # metric_name -> running [count, total, mean, m2, min, max], updated
+        # in O(1) (Welford) instead of keeping every sample
+        self.metrics = defaultdict(_new_aggregate)
         self.counters = defaultdict(int)
+        self._lock = threading.Lock()
     
     def record_time(self, metric_name, duration):
         """
@@ -20,7 +34,19 @@ class MetricsCollector:
             metric_name: Name of the metric
             duration: Duration in seconds
         """
-        self.metrics[metric_name].append(duration)
+        with self._lock:
+            aggregate = self.metrics[metric_name]
+            aggregate[_COUNT] += 1
+            aggregate[_TOTAL] += duration
+            
+            delta = duration - aggregate[_MEAN]
+            aggregate[_MEAN] += delta / aggregate[_COUNT]
+            aggregate[_M2] += delta * (duration - aggregate[_MEAN])
+            
+            if duration < aggregate[_MIN]:
+                aggregate[_MIN] = duration
+            if duration > aggregate[_MAX]:
+                aggregate[_MAX] = duration
     
     def increment_counter(self, counter_name, value=1):
         """
@@ -30,7 +56,8 @@ class MetricsCollector:
             counter_name: Name of the counter
             value: Increment value (default: 1)
         """
-        self.counters[counter_name] += value
+        with self._lock:
+            self.counters[counter_name] += value
     
     def get_stats(self, metric_name):
         """
@@ -40,25 +67,28 @@ class MetricsCollector:
             metric_name: Name of the metric
         
         Returns:
-            dict: Statistics (mean, min, max, count)
+            dict: Statistics (mean, std, min, max, count, total)
         """
-        values = self.metrics.get(metric_name, [])
+        aggregate = self.metrics.get(metric_name)
         
-        if not values:
+        if not aggregate:
             return {
                 'count': 0,
                 'mean': 0,
+                'std': 0,
                 'min': 0,
                 'max': 0,
                 'total': 0
             }
         
+        count = aggregate[_COUNT]
         return {
-            'count': len(values),
-            'mean': sum(values) / len(values),
-            'min': min(values),
-            'max': max(values),
-            'total': sum(values)
+            'count': count,
+            'mean': aggregate[_MEAN],
+            'std': math.sqrt(aggregate[_M2] / count),
+            'min': aggregate[_MIN],
+            'max': aggregate[_MAX],
+            'total': aggregate[_TOTAL]
         }
     
     def get_counter(self, counter_name):
@@ -85,15 +115,16 @@ class MetricsCollector:
             'counters': dict(self.counters)
         }
         
-        for metric_name in self.metrics:
+        for metric_name in list(self.metrics):
             result['timings'][metric_name] = self.get_stats(metric_name)
         
         return result
     
     def clear(self):
         """Clear all metrics."""
-        self.metrics.clear()
-        self.counters.clear()
+        with self._lock:
+            self.metrics.clear()
+            self.counters.clear()
 
 
 class Timer:
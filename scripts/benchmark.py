@@ -1,10 +1,14 @@
 """Performance benchmarking script."""
 
 import argparse
+import gc
 import sys
 import os
 import time
 import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -14,52 +18,126 @@ from fingerprint.storage import MemoryStore, SQLiteStore
 from fingerprint.utils.logger import setup_logger
 
 
-def benchmark_fingerprinting(audio_files, num_samples=10):
+# Per-process fingerprinter, built once by _init_worker
+_worker_fingerprinter = None
+
+
+# Seconds of seeded noise fingerprinted by each worker before timing
+# starts; silence has no peaks, so it would skip hash generation
+WARMUP_SECONDS = 5
+
+
+def _init_worker():
+    """Build and warm up the fingerprinter for a benchmark worker process."""
+    global _worker_fingerprinter
+    _worker_fingerprinter = Fingerprinter()
+    
+    # Build FFT plans and compile numba kernels outside the timed runs
+    warmup_audio = np.random.default_rng(0).standard_normal(
+        _worker_fingerprinter.sr * WARMUP_SECONDS
+    ).astype(np.float32)
+    hash_values, _, _ = generate_hashes(_worker_fingerprinter.generate_fingerprint(warmup_audio))
+    if len(hash_values) == 0:
+        setup_logger().warning(
+            "Warmup generated no hashes; the first timed file includes kernel compilation"
+        )
+
+
+def _fingerprint_one(filepath):
+    """
+    Time loading and fingerprinting one file in a worker process.
+    
+    Args:
+        filepath: Path to audio file
+    
+    Returns:
+        float: Elapsed seconds, or None if the file could not be processed
+    """
+    try:
+        start_time = time.perf_counter_ns()
+        
+        # Load and process
+        audio, sr = load_audio(filepath)
+        audio = preprocess_audio(audio)
+        
+        # Generate fingerprint
+        peaks = _worker_fingerprinter.generate_fingerprint(audio)
+        generate_hashes(peaks)
+        
+        return (time.perf_counter_ns() - start_time) * 1e-9
+    
+    except Exception as e:
+        print(f"Error processing {filepath}: {e}")
+        return None
+
+
+def _summarize_times(times):
+    """
+    Summarize benchmark timings.
+    
+    Args:
+        times: Sequence of elapsed times in seconds
+    
+    Returns:
+        dict: mean_time, min_time, max_time, p50_time, p95_time,
+            p99_time and samples
+    """
+    times = np.asarray(times, dtype=np.float64)
+    if times.size == 0:
+        return {
+            'mean_time': 0, 'min_time': 0, 'max_time': 0,
+            'p50_time': 0, 'p95_time': 0, 'p99_time': 0,
+            'samples': 0
+        }
+    
+    p50, p95, p99 = np.percentile(times, [50, 95, 99])
+    return {
+        'mean_time': float(times.mean()),
+        'min_time': float(times.min()),
+        'max_time': float(times.max()),
+        'p50_time': float(p50),
+        'p95_time': float(p95),
+        'p99_time': float(p99),
+        'samples': int(times.size)
+    }
+
+
+def benchmark_fingerprinting(audio_files, num_samples=10, num_workers=None):
     """
     Benchmark fingerprinting performance.
     
+    Files are fingerprinted in parallel worker processes; each file is
+    timed inside its worker.
+    
     Args:
         audio_files: List of audio file paths
         num_samples: Number of samples to test
+        num_workers: Number of worker processes (default: CPU count - 1)
     
     Returns:
         dict: Benchmark results
     """
-    fingerprinter = Fingerprinter()
-    times = []
+    if num_workers is None:
+        num_workers = max(1, (os.cpu_count() or 1) - 1)
     
     sample_files = random.sample(audio_files, min(num_samples, len(audio_files)))
     
-    for filepath in sample_files:
-        try:
-            start_time = time.time()
-            
-            # Load and process
-            audio, sr = load_audio(filepath)
-            audio = preprocess_audio(audio)
-            
-            # Generate fingerprint
-            peaks = fingerprinter.generate_fingerprint(audio)
-            hashes = generate_hashes(peaks)
-            
-            elapsed = time.time() - start_time
-            times.append(elapsed)
-            
-        except Exception as e:
-            print(f"Error processing {filepath}: {e}")
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker) as executor:
+        times = [
+            elapsed for elapsed in executor.map(_fingerprint_one, sample_files)
+            if elapsed is not None
+        ]
     
-    return {
-        'mean_time': sum(times) / len(times) if times else 0,
-        'min_time': min(times) if times else 0,
-        'max_time': max(times) if times else 0,
-        'samples': len(times)
-    }
+    return _summarize_times(times)
 
 
 def benchmark_matching(storage, query_files, num_queries=10):
     """
     Benchmark matching performance.
     
+    Query fingerprints are computed up front, so the timed region covers
+    only match_fingerprint.
+    
     Args:
         storage: Storage backend
         query_files: List of query audio files
@@ -69,34 +147,35 @@ def benchmark_matching(storage, query_files, num_queries=10):
         dict: Benchmark results
     """
     fingerprinter = Fingerprinter()
-    times = []
     
     sample_files = random.sample(query_files, min(num_queries, len(query_files)))
     
+    # Generate query fingerprints, skipping files that fail to load
+    queries = []
     for filepath in sample_files:
         try:
-            # Generate query fingerprint
             audio, sr = load_audio(filepath)
             audio = preprocess_audio(audio)
             peaks = fingerprinter.generate_fingerprint(audio)
-            query_hashes = generate_hashes(peaks)
-            
-            # Benchmark matching
-            start_time = time.time()
-            matches = match_fingerprint(query_hashes, storage)
-            elapsed = time.time() - start_time
-            
-            times.append(elapsed)
-            
+            queries.append((filepath, generate_hashes(peaks)))
+        
         except Exception as e:
             print(f"Error querying {filepath}: {e}")
     
-    return {
-        'mean_time': sum(times) / len(times) if times else 0,
-        'min_time': min(times) if times else 0,
-        'max_time': max(times) if times else 0,
-        'samples': len(times)
-    }
+    # Benchmark matching, keeping garbage collection out of the timings;
+    # unreadable files were already dropped above
+    times = np.empty(len(queries), dtype=np.float64)
+    for i, (_, query_hashes) in enumerate(queries):
+        gc.collect()
+        gc.disable()
+        try:
+            start_time = time.perf_counter_ns()
+            match_fingerprint(query_hashes, storage)
+            times[i] = (time.perf_counter_ns() - start_time) * 1e-9
+        finally:
+            gc.enable()
+    
+    return _summarize_times(times)
 
 
 def main():
@@ -132,6 +211,13 @@ def main():
         help='Number of samples for fingerprinting benchmark'
     )
     
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Worker processes for the fingerprinting benchmark (default: CPU count - 1)'
+    )
+    
     parser.add_argument(
         '--num-queries',
         type=int,
@@ -146,7 +232,8 @@ def main():
     # Find audio files
     from fingerprint.training import DatasetLoader
     loader = DatasetLoader()
-    audio_files = loader.find_audio_files(args.audio_dir)
+    # Files are sampled at random, so skip find_audio_files' sort
+    audio_files = list(loader.iter_audio_files(args.audio_dir))
     
     if not audio_files:
         logger.error(f"No audio files found in {args.audio_dir}")
@@ -159,12 +246,15 @@ def main():
     logger.info("Benchmarking Fingerprinting Performance")
     logger.info("=" * 60)
     
-    fp_results = benchmark_fingerprinting(audio_files, args.num_samples)
+    fp_results = benchmark_fingerprinting(audio_files, args.num_samples, args.workers)
     
     logger.info(f"Samples tested: {fp_results['samples']}")
     logger.info(f"Mean time: {fp_results['mean_time']:.3f}s")
     logger.info(f"Min time: {fp_results['min_time']:.3f}s")
     logger.info(f"Max time: {fp_results['max_time']:.3f}s")
+    logger.info(f"P50 time: {fp_results['p50_time']:.3f}s")
+    logger.info(f"P95 time: {fp_results['p95_time']:.3f}s")
+    logger.info(f"P99 time: {fp_results['p99_time']:.3f}s")
     
     # Benchmark matching (if database exists)
     if args.storage_type == 'sqlite' and os.path.exists(args.db_path):
@@ -179,6 +269,9 @@ def main():
         logger.info(f"Mean time: {match_results['mean_time']:.3f}s")
         logger.info(f"Min time: {match_results['min_time']:.3f}s")
         logger.info(f"Max time: {match_results['max_time']:.3f}s")
+        logger.info(f"P50 time: {match_results['p50_time']:.3f}s")
+        logger.info(f"P95 time: {match_results['p95_time']:.3f}s")
+        logger.info(f"P99 time: {match_results['p99_time']:.3f}s")
         
         # Get storage stats
         stats = storage.get_stats()
@@ -4,7 +4,24 @@ import argparse
 import sys
 import os
 import json
-import pickle
+
+import joblib
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional
+    msgpack = None
+
+try:
+    import lz4  # noqa: F401 (enables joblib's lz4 compressor)
+    PICKLE_COMPRESSION = ('lz4', 3)
+except ImportError:  # lz4 is optional
+    PICKLE_COMPRESSION = ('zlib', 3)
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -13,40 +30,54 @@ from fingerprint.storage import MemoryStore, SQLiteStore
 from fingerprint.utils.logger import setup_logger
 
 
+def _dumps(obj):
+    """Encode obj as UTF-8 JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj).encode('utf-8')
+
+
 def export_to_json(storage, output_path):
     """
     Export database to JSON format.
     
+    Songs are streamed from storage and written one per line, so memory
+    use does not grow with the number of songs.
+    
     Args:
         storage: Storage backend
         output_path: Output file path
     """
     logger = setup_logger()
     
-    # Get all songs and metadata
-    songs = storage.get_all_songs()
     stats = storage.get_stats()
-    
-    export_data = {
-        'metadata': {
-            'storage_type': stats.get('storage_type'),
-            'total_songs': stats.get('total_songs'),
-            'total_hashes': stats.get('total_hashes'),
-            'export_timestamp': None  # Could add timestamp
-        },
-        'songs': songs
+    metadata = {
+        'storage_type': stats.get('storage_type'),
+        'total_songs': stats.get('total_songs'),
+        'total_hashes': stats.get('total_hashes'),
+        'export_timestamp': None  # Could add timestamp
     }
     
-    # Write to file
-    with open(output_path, 'w') as f:
-        json.dump(export_data, f, indent=2)
-    
-    logger.info(f"Exported {len(songs)} songs to {output_path}")
+    # Write the same {"metadata": ..., "songs": [...]} document as before,
+    # one song at a time
+    num_songs = 0
+    with open(output_path, 'wb') as f:
+        f.write(b'{"metadata": ' + _dumps(metadata) + b',\n"songs": [')
+        for song in storage.iter_songs():
+            f.write(b'\n' if num_songs == 0 else b',\n')
+            f.write(_dumps(song))
+            num_songs += 1
+        f.write(b'\n]}\n')
+    
+    logger.info(f"Exported {num_songs} songs to {output_path}")
 
 
 def export_to_pickle(storage, output_path):
     """
-    Export database to pickle format (includes hashes).
+    Export database to a compressed joblib pickle (includes hashes).
+    
+    The index is saved as flat NumPy columns, which joblib writes as raw
+    array buffers instead of pickling one object per hash.
     
     Args:
         storage: Storage backend
@@ -55,15 +86,7 @@ def export_to_pickle(storage, output_path):
     logger = setup_logger()
     
     if isinstance(storage, MemoryStore):
-        # For memory store, we can pickle the entire data structure
-        export_data = {
-            'hash_table': dict(storage.hash_table),
-            'song_metadata': storage.song_metadata,
-            'total_hashes': storage.total_hashes
-        }
-        
-        with open(output_path, 'wb') as f:
-            pickle.dump(export_data, f)
+        joblib.dump(storage.to_arrays(), output_path, compress=PICKLE_COMPRESSION)
         
         logger.info(f"Exported database to {output_path}")
     else:
@@ -71,6 +94,38 @@ def export_to_pickle(storage, output_path):
         sys.exit(1)
 
 
+def export_to_msgpack(storage, output_path):
+    """
+    Export database to msgpack (includes hashes).
+    
+    Each index column is stored as its dtype name plus the raw array
+    bytes, so the file can be read without Python or pickle.
+    
+    Args:
+        storage: Storage backend
+        output_path: Output file path
+    """
+    logger = setup_logger()
+    
+    if msgpack is None:
+        logger.error("msgpack export requires the msgpack package")
+        sys.exit(1)
+    
+    if not isinstance(storage, MemoryStore):
+        logger.error("msgpack export only supported for MemoryStore")
+        sys.exit(1)
+    
+    export_data = storage.to_arrays()
+    for name in ('hash_values', 'song_idx', 'time_offsets'):
+        column = export_data[name]
+        export_data[name] = {'dtype': column.dtype.str, 'data': column.tobytes()}
+    
+    with open(output_path, 'wb') as f:
+        msgpack.pack(export_data, f, use_bin_type=True)
+    
+    logger.info(f"Exported database to {output_path}")
+
+
 def main():
     """Main entry point."""
     parser = argparse.ArgumentParser(description='Export/backup fingerprint database')
@@ -101,7 +156,7 @@ def main():
         '--format',
         type=str,
         default='json',
-        choices=['json', 'pickle'],
+        choices=['json', 'pickle', 'msgpack'],
         help='Export format (default: json)'
     )
     
@@ -129,6 +184,8 @@ def main():
         export_to_json(storage, args.output)
     elif args.format == 'pickle':
         export_to_pickle(storage, args.output)
+    elif args.format == 'msgpack':
+        export_to_msgpack(storage, args.output)
     
     logger.info("Export complete!")
 
@@ -4,7 +4,19 @@ import argparse
 import sys
 import os
 import json
-import pickle
+
+import joblib
+import numpy as np
+
+try:
+    import ijson
+except ImportError:  # ijson is optional
+    ijson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional
+    msgpack = None
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -13,6 +25,31 @@ from fingerprint.storage import MemoryStore, SQLiteStore
 from fingerprint.utils.logger import setup_logger
 
 
+# Songs written per transaction by import_from_json
+IMPORT_BATCH_SONGS = 1000
+
+
+def _iter_json_songs(input_path):
+    """
+    Iterate over the songs in a JSON export.
+    
+    Streams the songs array with ijson when it is installed; otherwise
+    the whole document is loaded.
+    
+    Args:
+        input_path: Input file path
+    
+    Yields:
+        dict: Song metadata
+    """
+    with open(input_path, 'rb') as f:
+        if ijson is not None:
+            # use_float keeps durations as float instead of Decimal
+            yield from ijson.items(f, 'songs.item', use_float=True)
+        else:
+            yield from json.load(f).get('songs', [])
+
+
 def import_from_json(storage, input_path):
     """
     Import database from JSON format.
@@ -23,26 +60,65 @@ def import_from_json(storage, input_path):
     """
     logger = setup_logger()
     
-    # Read from file
-    with open(input_path, 'r') as f:
-        import_data = json.load(f)
-    
-    songs = import_data.get('songs', [])
-    
-    logger.info(f"Importing {len(songs)} songs...")
+    logger.info(f"Importing songs from {input_path}...")
     
     # Note: JSON export doesn't include hashes, only metadata
     logger.warning("JSON import only restores song metadata, not fingerprint hashes")
     logger.warning("You need to re-index songs to generate fingerprints")
     
-    # Store metadata
-    for song in songs:
-        song_id = song.get('song_id')
-        if song_id:
-            # Store with empty hashes
-            storage.store_fingerprint(song_id, song, [])
+    # Store metadata (with empty hashes), one transaction per batch
+    num_songs = 0
+    batch = []
+    storage.begin_bulk_load()
+    try:
+        for song in _iter_json_songs(input_path):
+            song_id = song.get('song_id')
+            if song_id:
+                batch.append((song_id, song, [], []))
+            
+            if len(batch) >= IMPORT_BATCH_SONGS:
+                storage.store_fingerprints(batch)
+                num_songs += len(batch)
+                batch = []
+        
+        if batch:
+            storage.store_fingerprints(batch)
+            num_songs += len(batch)
+    finally:
+        storage.end_bulk_load()
+    
+    logger.info(f"Imported {num_songs} song metadata entries")
+
+
+def _convert_hash_table(hash_table, song_metadata):
+    """
+    Convert a pickle from the original exporter into load_arrays() columns.
+    
+    Args:
+        hash_table: Dictionary of hash -> list of (song_id, time_offset)
+        song_metadata: Dictionary of song_id -> metadata
     
-    logger.info(f"Imported {len(songs)} song metadata entries")
+    Returns:
+        dict: Keyword arguments for MemoryStore.load_arrays()
+    """
+    song_index = {song_id: idx for idx, song_id in enumerate(song_metadata)}
+    
+    hash_values = []
+    song_idx = []
+    time_offsets = []
+    for hash_value, entries in hash_table.items():
+        for song_id, time_offset in entries:
+            hash_values.append(hash_value)
+            song_idx.append(song_index.setdefault(song_id, len(song_index)))
+            time_offsets.append(time_offset)
+    
+    return {
+        'song_ids': list(song_index),
+        'song_metadata': song_metadata,
+        'hash_values': np.array(hash_values, dtype=np.int64),
+        'song_idx': np.array(song_idx, dtype=np.int32),
+        'time_offsets': np.array(time_offsets, dtype=np.int32)
+    }
 
 
 def import_from_pickle(storage, input_path):
@@ -59,14 +135,49 @@ def import_from_pickle(storage, input_path):
         logger.error("Pickle import only supported for MemoryStore")
         sys.exit(1)
     
-    # Read from file
+    # Read from file (also reads plain pickles from the original exporter)
+    import_data = joblib.load(input_path)
+    
+    # Restore data; the original exporter wrote a hash -> [(song_id,
+    # time_offset), ...] dict instead of columns
+    if 'hash_table' in import_data:
+        storage.load_arrays(**_convert_hash_table(
+            import_data['hash_table'], import_data['song_metadata']
+        ))
+    else:
+        storage.load_arrays(**import_data)
+    
+    logger.info(f"Imported {len(storage.song_metadata)} songs")
+    logger.info(f"Total hashes: {storage.total_hashes}")
+
+
+def import_from_msgpack(storage, input_path):
+    """
+    Import database from msgpack format.
+    
+    Args:
+        storage: Storage backend
+        input_path: Input file path
+    """
+    logger = setup_logger()
+    
+    if msgpack is None:
+        logger.error("msgpack import requires the msgpack package")
+        sys.exit(1)
+    
+    if not isinstance(storage, MemoryStore):
+        logger.error("msgpack import only supported for MemoryStore")
+        sys.exit(1)
+    
     with open(input_path, 'rb') as f:
-        import_data = pickle.load(f)
+        import_data = msgpack.unpack(f, raw=False)
+    
+    # Columns are stored as raw bytes with their dtype
+    for name in ('hash_values', 'song_idx', 'time_offsets'):
+        column = import_data[name]
+        import_data[name] = np.frombuffer(column['data'], dtype=column['dtype'])
     
-    # Restore data
-    storage.hash_table = import_data['hash_table']
-    storage.song_metadata = import_data['song_metadata']
-    storage.total_hashes = import_data['total_hashes']
+    storage.load_arrays(**import_data)
     
     logger.info(f"Imported {len(storage.song_metadata)} songs")
     logger.info(f"Total hashes: {storage.total_hashes}")
@@ -102,7 +213,7 @@ def main():
         '--format',
         type=str,
         default='json',
-        choices=['json', 'pickle'],
+        choices=['json', 'pickle', 'msgpack'],
         help='Import format (default: json)'
     )
     
@@ -130,6 +241,8 @@ def main():
         import_from_json(storage, args.input)
     elif args.format == 'pickle':
         import_from_pickle(storage, args.input)
+    elif args.format == 'msgpack':
+        import_from_msgpack(storage, args.input)
     
     logger.info("Import complete!")
 
@@ -3,11 +3,12 @@
 import argparse
 import sys
 import os
+import time
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from fingerprint.storage import MemoryStore, SQLiteStore
+from fingerprint.storage import MemoryStore, MmapStore, SQLiteStore
 from fingerprint.training import Indexer
 from fingerprint.utils.logger import setup_logger
 
@@ -27,7 +28,7 @@ def main():
         '--storage-type',
         type=str,
         default='memory',
-        choices=['memory', 'sqlite'],
+        choices=['memory', 'mmap', 'sqlite'],
         help='Storage backend type (default: memory)'
     )
     
@@ -38,6 +39,13 @@ def main():
         help='Database file path for SQLite (default: ./data/database/fingerprint.db)'
     )
     
+    parser.add_argument(
+        '--index-dir',
+        type=str,
+        default='./data/database/fingerprint_index',
+        help='Index directory for mmap (default: ./data/database/fingerprint_index)'
+    )
+    
     parser.add_argument(
         '--workers',
         type=int,
@@ -75,6 +83,8 @@ def main():
     
     if args.storage_type == 'memory':
         storage = MemoryStore()
+    elif args.storage_type == 'mmap':
+        storage = MmapStore(args.index_dir)
     elif args.storage_type == 'sqlite':
         # Create database directory if it doesn't exist
         db_dir = os.path.dirname(args.db_path)
@@ -89,8 +99,15 @@ def main():
     logger.info("Initializing indexer...")
     indexer = Indexer(storage, sr=args.sample_rate)
     
-    # Progress callback
+    # Progress callback, logging at most once per second (plus the last file)
+    last_log_time = [0.0]
+    
     def progress_callback(current, total, filename):
+        now = time.time()
+        if current < total and now - last_log_time[0] < 1.0:
+            return
+        last_log_time[0] = now
+        
         percent = (current / total) * 100 if total > 0 else 0
         logger.info(f"Progress: {current}/{total} ({percent:.1f}%) - {filename}")
     
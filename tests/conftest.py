@@ -0,0 +1,7 @@
+"""Shared pytest configuration."""
+
+import os
+import sys
+
+# Add parent directory to path once for every test module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -1,12 +1,10 @@
 """Unit tests for API endpoints."""
 
 import unittest
-import sys
-import os
 import io
 
-# Add parent directory to path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+import soundfile as sf
 
 from fingerprint.api import create_app
 
@@ -14,11 +12,12 @@ from fingerprint.api import create_app
 class TestAPI(unittest.TestCase):
     """Test cases for Flask API."""
     
-    def setUp(self):
-        """Set up test fixtures."""
-        self.app = create_app('development')
-        self.app.config['TESTING'] = True
-        self.client = self.app.test_client()
+    @classmethod
+    def setUpClass(cls):
+        """Set up test fixtures once; the tests below do not modify the app."""
+        cls.app = create_app('development')
+        cls.app.config['TESTING'] = True
+        cls.client = cls.app.test_client()
     
     def test_health_check(self):
         """Test health check endpoint."""
@@ -74,13 +73,46 @@ class TestAPI(unittest.TestCase):
         
         self.assertEqual(response.status_code, 400)
     
+    def test_search_raw_stream_invalid_file_type(self):
+        """Test raw octet-stream search with invalid file type."""
+        response = self.client.post(
+            '/api/v1/search?filename=test.txt',
+            data=b"test data",
+            content_type='application/octet-stream'
+        )
+        
+        self.assertEqual(response.status_code, 400)
+    
+    def test_search_raw_stream_no_filename(self):
+        """Test raw octet-stream search without a filename."""
+        response = self.client.post(
+            '/api/v1/search',
+            data=b"test data",
+            content_type='application/octet-stream'
+        )
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.get_json())
+    
+    def test_search_raw_stream_wav(self):
+        """Test raw upload decoded from memory."""
+        buffer = io.BytesIO()
+        t = np.linspace(0, 1, 11025, endpoint=False)
+        sf.write(buffer, np.sin(2 * np.pi * 440 * t), 11025, format='WAV')
+        
+        response = self.client.post(
+            '/api/v1/search?filename=query.wav',
+            data=buffer.getvalue(),
+            content_type='application/octet-stream'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertFalse(data['found'])
+        self.assertAlmostEqual(data['query_duration_sec'], 1.0, places=2)
+    
     def test_get_song_not_found(self):
         """Test get song with non-existent ID."""
         response = self.client.get('/api/v1/songs/nonexistent')
         
         self.assertEqual(response.status_code, 404)
-
-
-if __name__ == '__main__':
-    unittest.main()
-
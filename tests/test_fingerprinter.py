@@ -2,13 +2,22 @@
 
 import unittest
 import numpy as np
-import sys
-import os
-
-# Add parent directory to path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from fingerprint.core import Fingerprinter, generate_hashes
+from fingerprint.core import hash_generator
+
+
+# 2 seconds of a 440 Hz sine wave, float32 like load_audio output; shared
+# by the tests instead of rebuilt for each one
+SR = 11025
+SYNTH_AUDIO = np.sin(
+    2 * np.pi * 440 * np.arange(int(SR * 2.0), dtype=np.float32) / SR
+).astype(np.float32)
+SYNTH_AUDIO.setflags(write=False)
+
+# Seeded low-level noise spectrogram for peak detection tests
+NOISE_SPECTROGRAM = np.random.default_rng(0).random((100, 100), dtype=np.float32) * 5
+NOISE_SPECTROGRAM.setflags(write=False)
 
 
 class TestFingerprinter(unittest.TestCase):
@@ -20,39 +29,34 @@ class TestFingerprinter(unittest.TestCase):
     
     def test_generate_fingerprint(self):
         """Test fingerprint generation from audio."""
-        # Create synthetic audio signal
-        duration = 2.0  # seconds
-        sr = 11025
-        t = np.linspace(0, duration, int(sr * duration))
-        audio = np.sin(2 * np.pi * 440 * t)  # 440 Hz sine wave
-        
         # Generate fingerprint
-        peaks = self.fingerprinter.generate_fingerprint(audio)
+        peaks = self.fingerprinter.generate_fingerprint(SYNTH_AUDIO)
         
         # Assertions
-        self.assertIsInstance(peaks, list)
-        self.assertGreater(len(peaks), 0, "Should find some peaks")
+        time_idx, freq_idx, amplitudes = peaks
+        self.assertGreater(len(time_idx), 0, "Should find some peaks")
         
         # Check peak structure
-        if peaks:
-            time_idx, freq_idx, amplitude = peaks[0]
-            self.assertIsInstance(time_idx, (int, np.integer))
-            self.assertIsInstance(freq_idx, (int, np.integer))
-            self.assertIsInstance(amplitude, (float, np.floating))
+        self.assertEqual(len(time_idx), len(freq_idx))
+        self.assertEqual(len(time_idx), len(amplitudes))
+        self.assertTrue(np.issubdtype(time_idx.dtype, np.integer))
+        self.assertTrue(np.issubdtype(freq_idx.dtype, np.integer))
+        self.assertTrue(np.issubdtype(amplitudes.dtype, np.floating))
+        self.assertTrue(np.all(np.diff(time_idx) >= 0), "Peaks should be sorted by time")
     
     def test_find_spectral_peaks(self):
         """Test spectral peak detection."""
         # Create simple spectrogram with known peaks
-        spectrogram = np.random.rand(100, 100) * 5
+        spectrogram = NOISE_SPECTROGRAM.copy()
         
         # Add some strong peaks
         spectrogram[50, 50] = 100
         spectrogram[25, 75] = 80
         
-        peaks = self.fingerprinter._find_spectral_peaks(spectrogram)
+        time_idx, freq_idx, amplitudes = self.fingerprinter._find_spectral_peaks(spectrogram)
         
-        self.assertIsInstance(peaks, list)
-        self.assertGreater(len(peaks), 0)
+        self.assertGreater(len(time_idx), 0)
+        self.assertIn((50, 50), set(zip(time_idx.tolist(), freq_idx.tolist())))
     
     def test_hash_generation(self):
         """Test hash generation from peaks."""
@@ -64,18 +68,42 @@ class TestFingerprinter(unittest.TestCase):
             (15, 250, 35.0),
         ]
         
-        hashes = generate_hashes(peaks, song_id='test_song', fan_value=3)
+        hash_values, time_offsets, song_id = generate_hashes(
+            peaks, song_id='test_song', fan_value=3
+        )
         
         # Assertions
-        self.assertIsInstance(hashes, list)
-        self.assertGreater(len(hashes), 0, "Should generate hashes")
+        self.assertIsInstance(hash_values, np.ndarray)
+        self.assertEqual(hash_values.dtype, np.int64)
+        self.assertEqual(len(hash_values), len(time_offsets))
+        self.assertEqual(len(hash_values), 6, "Should pair each anchor with up to 3 peaks")
+        self.assertEqual(song_id, 'test_song')
         
         # Check hash structure
-        if hashes:
-            hash_value, time_offset, song_id = hashes[0]
-            self.assertIsInstance(hash_value, int)
-            self.assertIsInstance(time_offset, (int, np.integer))
-            self.assertEqual(song_id, 'test_song')
+        self.assertEqual(int(hash_values[0]), (100 << 20) | (150 << 10) | 5)
+        self.assertEqual(int(time_offsets[0]), 0)
+    
+    def test_hash_generation_single_peak(self):
+        """Test fewer than two peaks give empty hash arrays."""
+        hash_values, time_offsets, _ = generate_hashes([(0, 100, 50.0)])
+        
+        self.assertEqual(len(hash_values), 0)
+        self.assertEqual(hash_values.dtype, np.int64)
+        self.assertEqual(time_offsets.dtype, np.int32)
+    
+    @unittest.skipIf(hash_generator._generate_hashes_numba is None, "numba not installed")
+    def test_hash_generation_numba_matches_numpy(self):
+        """Test compiled and vectorized hash generation agree."""
+        rng = np.random.default_rng(0)
+        times = np.sort(rng.integers(0, 3000, 500)).astype(np.int64)
+        times[250:] += 2000  # Force some time deltas over the 10-bit limit
+        freqs = rng.integers(0, 1024, 500).astype(np.int64)
+        
+        numba_hashes, numba_times = hash_generator._generate_hashes_numba(times, freqs, 5)
+        numpy_hashes, numpy_times = hash_generator._generate_hashes_numpy(times, freqs, 5)
+        
+        np.testing.assert_array_equal(numba_hashes, numpy_hashes)
+        np.testing.assert_array_equal(numba_times, numpy_times)
     
     def test_empty_audio(self):
         """Test handling of empty audio."""
@@ -84,22 +112,18 @@ class TestFingerprinter(unittest.TestCase):
         # Should not crash
         try:
             peaks = self.fingerprinter.generate_fingerprint(audio)
-            # May return empty list or raise exception
-            self.assertIsInstance(peaks, list)
+            # May return empty arrays or raise exception
+            self.assertIsInstance(peaks, tuple)
         except Exception:
             # Exception is acceptable for empty audio
             pass
     
     def test_silent_audio(self):
         """Test handling of silent audio."""
-        audio = np.zeros(11025)  # 1 second of silence
+        audio = np.zeros(SR, dtype=np.float32)  # 1 second of silence
         
         peaks = self.fingerprinter.generate_fingerprint(audio)
         
         # Should return few or no peaks for silent audio
-        self.assertIsInstance(peaks, list)
-
-
-if __name__ == '__main__':
-    unittest.main()
-
+        self.assertIsInstance(peaks, tuple)
+        self.assertEqual(len(peaks), 3)
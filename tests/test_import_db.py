@@ -0,0 +1,59 @@
+"""Unit tests for the database import script."""
+
+import unittest
+import tempfile
+import os
+import pickle
+
+from fingerprint.storage import MemoryStore
+from scripts.import_db import import_from_pickle
+
+
+class TestImportFromPickle(unittest.TestCase):
+    """Test cases for import_from_pickle."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.temp_dir.name, 'export.pkl')
+        self.storage = MemoryStore()
+    
+    def tearDown(self):
+        """Clean up test fixtures."""
+        self.temp_dir.cleanup()
+    
+    def test_import_hash_table_export(self):
+        """Test importing a pickle written by the original hash_table exporter."""
+        export_data = {
+            'hash_table': {
+                12345: [('song1', 0), ('song2', 7)],
+                23456: [('song1', 5)]
+            },
+            'song_metadata': {
+                'song1': {'title': 'Song 1'},
+                'song2': {'title': 'Song 2'}
+            },
+            'total_hashes': 3
+        }
+        with open(self.input_path, 'wb') as f:
+            pickle.dump(export_data, f)
+        
+        import_from_pickle(self.storage, self.input_path)
+        
+        self.assertEqual(sorted(self.storage.query_hash(12345)), [('song1', 0), ('song2', 7)])
+        self.assertEqual(self.storage.query_hash(23456), [('song1', 5)])
+        self.assertEqual(self.storage.get_song_metadata('song2')['title'], 'Song 2')
+        self.assertEqual(self.storage.total_hashes, 3)
+    
+    def test_import_array_export(self):
+        """Test importing a pickle of to_arrays() columns."""
+        source = MemoryStore()
+        source.store_fingerprint('song1', {'title': 'Song 1'}, [12345, 23456], [0, 5])
+        with open(self.input_path, 'wb') as f:
+            pickle.dump(source.to_arrays(), f)
+        
+        import_from_pickle(self.storage, self.input_path)
+        
+        self.assertEqual(self.storage.query_hash(23456), [('song1', 5)])
+        self.assertEqual(self.storage.get_stats(), source.get_stats())
+
@@ -1,13 +1,11 @@
 """Unit tests for matching module."""
 
 import unittest
-import sys
-import os
 
-# Add parent directory to path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
 
 from fingerprint.core import match_fingerprint
+from fingerprint.core.matcher import calculate_match_score, _max_aligned_loop, _max_aligned_numpy
 from fingerprint.storage import MemoryStore
 
 
@@ -19,36 +17,23 @@ class TestMatcher(unittest.TestCase):
         self.storage = MemoryStore()
         
         # Add test data
-        song1_hashes = [
-            (12345, 0, 'song1'),
-            (23456, 5, 'song1'),
-            (34567, 10, 'song1'),
-        ]
-        
-        song2_hashes = [
-            (45678, 0, 'song2'),
-            (56789, 5, 'song2'),
-        ]
-        
         self.storage.store_fingerprint(
             'song1',
             {'title': 'Song 1', 'artist': 'Artist 1'},
-            song1_hashes
+            [12345, 23456, 34567],
+            [0, 5, 10]
         )
         
         self.storage.store_fingerprint(
             'song2',
             {'title': 'Song 2', 'artist': 'Artist 2'},
-            song2_hashes
+            [45678, 56789],
+            [0, 5]
         )
     
     def test_exact_match(self):
         """Test exact match with same hashes."""
-        query_hashes = [
-            (12345, 0, None),
-            (23456, 5, None),
-            (34567, 10, None),
-        ]
+        query_hashes = ([12345, 23456, 34567], [0, 5, 10], None)
         
         matches = match_fingerprint(query_hashes, self.storage, top_k=5)
         
@@ -63,10 +48,7 @@ class TestMatcher(unittest.TestCase):
     
     def test_no_match(self):
         """Test query with no matching hashes."""
-        query_hashes = [
-            (99999, 0, None),
-            (88888, 5, None),
-        ]
+        query_hashes = ([99999, 88888], [0, 5], None)
         
         matches = match_fingerprint(query_hashes, self.storage, top_k=5)
         
@@ -77,10 +59,8 @@ class TestMatcher(unittest.TestCase):
     
     def test_partial_match(self):
         """Test partial match with some common hashes."""
-        query_hashes = [
-            (12345, 0, None),  # Matches song1
-            (99999, 5, None),  # No match
-        ]
+        # 12345 matches song1, 99999 has no match
+        query_hashes = ([12345, 99999], [0, 5], None)
         
         matches = match_fingerprint(query_hashes, self.storage, top_k=5)
         
@@ -88,7 +68,7 @@ class TestMatcher(unittest.TestCase):
     
     def test_empty_query(self):
         """Test with empty query."""
-        query_hashes = []
+        query_hashes = ([], [], None)
         
         matches = match_fingerprint(query_hashes, self.storage, top_k=5)
         
@@ -99,16 +79,87 @@ class TestMatcher(unittest.TestCase):
         """Test with empty database."""
         empty_storage = MemoryStore()
         
-        query_hashes = [
-            (12345, 0, None),
-        ]
+        query_hashes = ([12345], [0], None)
         
         matches = match_fingerprint(query_hashes, empty_storage, top_k=5)
         
         # Should return empty list
         self.assertEqual(len(matches), 0)
-
-
-if __name__ == '__main__':
-    unittest.main()
-
+    
+    def test_early_exit(self):
+        """Test matching stops once a candidate is clearly aligned."""
+        hash_values = list(range(1, 3001))
+        time_offsets = list(range(3000))
+        self.storage.store_fingerprint('song3', {'title': 'Song 3'}, hash_values, time_offsets)
+        
+        lookups = []
+        lookup_hashes_fn = self.storage.lookup_hashes
+        self.storage.lookup_hashes = lambda batch: lookups.append(len(batch)) or lookup_hashes_fn(batch)
+        
+        matches = match_fingerprint(
+            (hash_values, time_offsets, None),
+            self.storage,
+            early_exit_threshold=0.3,
+            batch_size=500,
+            min_hashes=1000
+        )
+        
+        self.assertEqual(lookups, [500, 500])
+        self.assertEqual(matches[0][0], 'song3')
+        self.assertAlmostEqual(matches[0][1], 1.0)
+    
+    def test_batched_scores_match_single_pass(self):
+        """Test batch-by-batch scoring gives the same matches as one lookup."""
+        rng = np.random.default_rng(0)
+        for i in range(5):
+            self.storage.store_fingerprint(
+                f'song_{i}', {'title': f'Song {i}'},
+                rng.integers(0, 500, size=400), rng.integers(0, 50, size=400)
+            )
+        query_hashes = (rng.integers(0, 500, size=1200), rng.integers(0, 50, size=1200), None)
+        
+        # A threshold above 1 is never reached, so every batch is scored
+        batched = match_fingerprint(
+            query_hashes, self.storage, top_k=10,
+            early_exit_threshold=2.0, batch_size=100, min_hashes=0
+        )
+        
+        self.assertEqual(batched, match_fingerprint(query_hashes, self.storage, top_k=10))
+    
+    def test_repeated_query_hash(self):
+        """Test a hash repeated in the query aligns at each of its offsets."""
+        # 12345 is stored at 0 in song1; querying it at 0 and 20 adds one
+        # match at each delta, and 23456/34567 align with the first
+        query_hashes = ([12345, 23456, 12345, 34567], [0, 5, 20, 10], None)
+        
+        matches = match_fingerprint(query_hashes, self.storage, top_k=5)
+        
+        self.assertEqual(matches[0][0], 'song1')
+        self.assertAlmostEqual(matches[0][1], 3 / 4)
+    
+    def test_top_k(self):
+        """Test only the top K candidates are returned, best first."""
+        query_hashes = ([12345, 23456, 45678], [0, 5, 0], None)
+        
+        matches = match_fingerprint(query_hashes, self.storage, top_k=1)
+        
+        self.assertEqual([song_id for song_id, _, _ in matches], ['song1'])
+        self.assertEqual(matches[0][2]['title'], 'Song 1')
+    
+    def test_aligned_count_kernels_agree(self):
+        """Test the scalar-loop and NumPy histogram kernels give the same counts."""
+        rng = np.random.default_rng(0)
+        song_idx = rng.integers(0, 20, size=5000).astype(np.int64)
+        time_deltas = rng.integers(-300, 300, size=5000).astype(np.int64)
+        
+        np.testing.assert_array_equal(
+            _max_aligned_loop(song_idx, time_deltas, 20),
+            _max_aligned_numpy(song_idx, time_deltas, 20)
+        )
+    
+    def test_calculate_match_score(self):
+        """Test histogram scoring with negative time offsets."""
+        time_offsets = [-3, -3, -3, 2, 7, 7]
+        
+        self.assertAlmostEqual(calculate_match_score(time_offsets, 6), 0.5)
+        self.assertEqual(calculate_match_score([], 6), 0.0)
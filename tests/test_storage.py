@@ -2,13 +2,16 @@
 
 import unittest
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 import os
-import sys
+import sqlite3
+import threading
+import weakref
 
-# Add parent directory to path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
 
-from fingerprint.storage import MemoryStore, SQLiteStore
+from fingerprint.core import generate_hashes
+from fingerprint.storage import MemoryStore, MmapStore, SQLiteStore, PostgresStore
 
 
 class TestMemoryStore(unittest.TestCase):
@@ -22,14 +25,11 @@ class TestMemoryStore(unittest.TestCase):
         """Test storing and retrieving fingerprints."""
         song_id = 'test_song_1'
         metadata = {'title': 'Test Song', 'artist': 'Test Artist'}
-        hashes = [
-            (12345, 0, song_id),
-            (23456, 5, song_id),
-            (34567, 10, song_id),
-        ]
+        hash_values = [12345, 23456, 34567]
+        time_offsets = [0, 5, 10]
         
         # Store
-        self.storage.store_fingerprint(song_id, metadata, hashes)
+        self.storage.store_fingerprint(song_id, metadata, hash_values, time_offsets)
         
         # Retrieve metadata
         retrieved_metadata = self.storage.get_song_metadata(song_id)
@@ -40,6 +40,88 @@ class TestMemoryStore(unittest.TestCase):
         self.assertGreater(len(results), 0)
         self.assertEqual(results[0][0], song_id)
     
+    def test_query_hashes(self):
+        """Test batched hash lookup."""
+        self.storage.store_fingerprint(
+            'song1',
+            {'title': 'Song 1'},
+            [12345, 23456, 12345],
+            [0, 5, 10]
+        )
+        
+        results = self.storage.query_hashes([12345, 23456, 99999])
+        
+        self.assertEqual(sorted(results[12345]), [('song1', 0), ('song1', 10)])
+        self.assertEqual(results[23456], [('song1', 5)])
+        self.assertFalse(results.get(99999))
+    
+    def test_lookup_hashes(self):
+        """Test array lookup returns one row per stored match."""
+        self.storage.store_fingerprint('song1', {'title': 'Song 1'}, [12345, 23456, 12345], [0, 5, 10])
+        self.storage.store_fingerprint('song2', {'title': 'Song 2'}, [12345], [7])
+        
+        hash_values, song_ids, time_offsets = self.storage.lookup_hashes([12345, 99999])
+        
+        self.assertEqual(
+            sorted(zip(hash_values.tolist(), song_ids.tolist(), time_offsets.tolist())),
+            [(12345, 'song1', 0), (12345, 'song1', 10), (12345, 'song2', 7)]
+        )
+        self.assertEqual(len(self.storage.lookup_hashes([99999])[0]), 0)
+    
+    def test_store_generated_hashes(self):
+        """Test generated hashes are stored in one sorted uint32 column."""
+        peaks = [(0, 100, 1.0), (5, 150, 1.0), (10, 200, 1.0)]
+        hash_values, time_offsets, _ = generate_hashes(peaks, fan_value=2)
+        
+        self.storage.store_fingerprint('song1', {'title': 'Song 1'}, hash_values, time_offsets)
+        self.storage.finalize()
+        
+        stored_hashes = self.storage.to_arrays()['hash_values']
+        self.assertEqual(stored_hashes.dtype, np.uint32)
+        self.assertTrue(np.all(np.diff(stored_hashes) >= 0))
+        self.assertEqual(self.storage.query_hash(int(hash_values[0])), [('song1', 0)])
+    
+    def test_wide_hashes(self):
+        """Test hashes beyond 32 bits keep an int64 column and still match."""
+        self.storage.store_fingerprint('song1', {'title': 'Song 1'}, [12345], [0])
+        self.assertEqual(self.storage.lookup_hashes([2 ** 40, -1])[0].tolist(), [])
+        
+        self.storage.store_fingerprint('song2', {'title': 'Song 2'}, [2 ** 40], [3])
+        
+        self.assertEqual(self.storage.to_arrays()['hash_values'].dtype, np.int64)
+        self.assertEqual(self.storage.query_hash(2 ** 40), [('song2', 3)])
+        self.assertEqual(self.storage.query_hash(12345), [('song1', 0)])
+    
+    def test_array_round_trip(self):
+        """Test to_arrays output restores an equivalent store."""
+        self.storage.store_fingerprint('song1', {'title': 'Song 1'}, [12345, 23456, 12345], [0, 5, 10])
+        self.storage.store_fingerprint('song2', {'title': 'Song 2'}, [12345], [7])
+        
+        restored = MemoryStore()
+        restored.load_arrays(**self.storage.to_arrays())
+        
+        self.assertEqual(
+            sorted(restored.query_hash(12345)),
+            [('song1', 0), ('song1', 10), ('song2', 7)]
+        )
+        self.assertEqual(restored.get_stats(), self.storage.get_stats())
+        self.assertEqual(restored.get_song_metadata('song2')['title'], 'Song 2')
+    
+    def test_store_mismatched_lengths(self):
+        """Test hashes and offsets of different lengths are rejected."""
+        with self.assertRaises(ValueError):
+            self.storage.store_fingerprint('song1', {'title': 'Song 1'}, [12345, 23456], [0])
+    
+    def test_store_after_query(self):
+        """Test hashes stored after the index is finalized are merged."""
+        self.storage.store_fingerprint('song1', {'title': 'Song 1'}, [12345], [0])
+        self.assertEqual(self.storage.query_hash(12345), [('song1', 0)])
+        
+        self.storage.store_fingerprint('song2', {'title': 'Song 2'}, [12345], [7])
+        
+        results = self.storage.query_hash(12345)
+        self.assertEqual(sorted(results), [('song1', 0), ('song2', 7)])
+    
     def test_get_all_songs(self):
         """Test getting all songs."""
         # Add multiple songs
@@ -47,7 +129,8 @@ class TestMemoryStore(unittest.TestCase):
             self.storage.store_fingerprint(
                 f'song_{i}',
                 {'title': f'Song {i}'},
-                [(i * 1000, 0, f'song_{i}')]
+                [i * 1000],
+                [0]
             )
         
         songs = self.storage.get_all_songs()
@@ -59,7 +142,8 @@ class TestMemoryStore(unittest.TestCase):
         self.storage.store_fingerprint(
             song_id,
             {'title': 'Test'},
-            [(12345, 0, song_id)]
+            [12345],
+            [0]
         )
         
         # Delete
@@ -68,13 +152,16 @@ class TestMemoryStore(unittest.TestCase):
         # Verify deletion
         metadata = self.storage.get_song_metadata(song_id)
         self.assertIsNone(metadata)
+        self.assertEqual(self.storage.query_hash(12345), [])
+        self.assertEqual(self.storage.get_stats()['total_hashes'], 0)
     
     def test_get_stats(self):
         """Test getting statistics."""
         self.storage.store_fingerprint(
             'song1',
             {'title': 'Song 1'},
-            [(12345, 0, 'song1'), (23456, 5, 'song1')]
+            [12345, 23456],
+            [0, 5]
         )
         
         stats = self.storage.get_stats()
@@ -89,7 +176,8 @@ class TestMemoryStore(unittest.TestCase):
         self.storage.store_fingerprint(
             'song1',
             {'title': 'Song 1'},
-            [(12345, 0, 'song1')]
+            [12345],
+            [0]
         )
         
         self.storage.clear()
@@ -102,30 +190,29 @@ class TestMemoryStore(unittest.TestCase):
 class TestSQLiteStore(unittest.TestCase):
     """Test cases for SQLiteStore."""
     
-    def setUp(self):
-        """Set up test fixtures."""
-        # Create temporary database
-        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
-        self.temp_db.close()
-        self.storage = SQLiteStore(self.temp_db.name)
+    @classmethod
+    def setUpClass(cls):
+        """Open one in-memory store for the whole class."""
+        cls.storage = SQLiteStore(':memory:')
     
-    def tearDown(self):
-        """Clean up test fixtures."""
-        # Delete temporary database
-        if os.path.exists(self.temp_db.name):
-            os.unlink(self.temp_db.name)
+    @classmethod
+    def tearDownClass(cls):
+        """Close the shared store."""
+        cls.storage.close()
+    
+    def setUp(self):
+        """Start each test from an empty database."""
+        self.storage.clear()
     
     def test_store_and_retrieve(self):
         """Test storing and retrieving fingerprints."""
         song_id = 'test_song_1'
         metadata = {'title': 'Test Song', 'artist': 'Test Artist'}
-        hashes = [
-            (12345, 0, song_id),
-            (23456, 5, song_id),
-        ]
+        hash_values = [12345, 23456]
+        time_offsets = [0, 5]
         
         # Store
-        self.storage.store_fingerprint(song_id, metadata, hashes)
+        self.storage.store_fingerprint(song_id, metadata, hash_values, time_offsets)
         
         # Retrieve metadata
         retrieved_metadata = self.storage.get_song_metadata(song_id)
@@ -136,6 +223,229 @@ class TestSQLiteStore(unittest.TestCase):
         self.assertGreater(len(results), 0)
         self.assertEqual(results[0][0], song_id)
     
+    def test_query_hashes(self):
+        """Test batched hash lookup across several IN batches."""
+        hash_values = list(range(1, 2001))
+        self.storage.store_fingerprint(
+            'song1',
+            {'title': 'Song 1'},
+            hash_values,
+            [h % 100 for h in hash_values]
+        )
+        
+        results = self.storage.query_hashes(hash_values + [99999])
+        
+        self.assertEqual(len(results), len(hash_values))
+        self.assertEqual(results[1500], [('song1', 0)])
+        self.assertFalse(results.get(99999))
+    
+    def test_lookup_hashes(self):
+        """Test array lookup returns one row per stored match."""
+        self.storage.store_fingerprint('song1', {'title': 'Song 1'}, [12345, 23456], [0, 5])
+        self.storage.store_fingerprint('song2', {'title': 'Song 2'}, [12345], [7])
+        
+        hash_values, song_ids, time_offsets = self.storage.lookup_hashes([12345, 99999])
+        
+        self.assertEqual(
+            sorted(zip(hash_values.tolist(), song_ids.tolist(), time_offsets.tolist())),
+            [(12345, 'song1', 0), (12345, 'song2', 7)]
+        )
+    
+    def test_iter_songs(self):
+        """Test streaming songs matches get_all_songs."""
+        for i in range(3):
+            self.storage.store_fingerprint(f'song_{i}', {'title': f'Song {i}'}, [i], [0])
+        
+        songs = self.storage.iter_songs()
+        
+        self.assertNotIsInstance(songs, list)
+        self.assertEqual(list(songs), self.storage.get_all_songs())
+        self.assertEqual(len(self.storage.get_all_songs()), 3)
+    
+    def test_store_fingerprints_batch(self):
+        """Test storing several songs in one call."""
+        self.storage.store_fingerprints([
+            ('song_1', {'title': 'Song 1'}, [12345, 23456], [0, 5]),
+            ('song_2', {'title': 'Song 2'}, [12345], [9]),
+        ])
+        
+        self.assertEqual(
+            sorted(self.storage.query_hash(12345)),
+            [('song_1', 0), ('song_2', 9)]
+        )
+        self.assertEqual(self.storage.get_stats()['total_songs'], 2)
+    
+    def test_store_fingerprints_repeated_song(self):
+        """Test a song repeated within one batch keeps one row and its latest metadata."""
+        self.storage.store_fingerprints([
+            ('song_1', {'title': 'Old'}, [12345], [0]),
+            ('song_1', {'title': 'New'}, [12345, 23456], [0, 5]),
+        ])
+        
+        self.assertEqual(self.storage.get_song_metadata('song_1')['title'], 'New')
+        self.assertEqual(self.storage.get_stats()['total_hashes'], 2)
+    
+    def test_store_many_hashes(self):
+        """Test a song with many hashes is stored in one call."""
+        hash_values = np.arange(10000, dtype=np.int64) * 7
+        time_offsets = np.arange(10000, dtype=np.int32)
+        
+        self.storage.store_fingerprint('song_1', {'title': 'Song 1'}, hash_values, time_offsets)
+        
+        self.assertEqual(self.storage.get_stats()['total_hashes'], 10000)
+        self.assertEqual(self.storage.query_hash(7 * 9999), [('song_1', 9999)])
+    
+    def test_reindex_song_does_not_duplicate(self):
+        """Test re-storing a song keeps one row per fingerprint."""
+        for _ in range(2):
+            self.storage.store_fingerprint('song_1', {'title': 'Song 1'}, [12345, 23456], [0, 5])
+        
+        self.assertEqual(self.storage.query_hash(12345), [('song_1', 0)])
+        self.assertEqual(self.storage.get_stats()['total_hashes'], 2)
+    
+    def test_reindex_song_replaces_fingerprints(self):
+        """Test re-storing a song drops fingerprints it no longer has."""
+        self.storage.store_fingerprint('song_1', {'title': 'Song 1'}, [12345, 23456], [0, 5])
+        self.storage.store_fingerprint('song_2', {'title': 'Song 2'}, [12345], [3])
+        self.storage.store_fingerprint('song_1', {'title': 'Song 1'}, [34567], [9])
+        
+        self.assertEqual(self.storage.query_hash(12345), [('song_2', 3)])
+        self.assertEqual(self.storage.query_hash(23456), [])
+        self.assertEqual(self.storage.query_hash(34567), [('song_1', 9)])
+        self.assertEqual(self.storage.get_stats()['total_hashes'], 2)
+    
+    def test_query_hash_uses_primary_key(self):
+        """Test hash lookups search the clustered primary key after ANALYZE."""
+        self.storage.begin_bulk_load()
+        self.storage.store_fingerprint(
+            'song_1', {'title': 'Song 1'}, np.arange(5000) * 3, np.arange(5000)
+        )
+        self.storage.end_bulk_load()
+        
+        plan = self.storage._get_connection().execute('''
+            EXPLAIN QUERY PLAN
+            SELECT songs.song_id, fingerprints.time_offset
+            FROM fingerprints
+            JOIN songs ON songs.song_pk = fingerprints.song_pk
+            WHERE fingerprints.hash_value = ?
+        ''', (12345,)).fetchall()
+        
+        details = [row[-1] for row in plan]
+        self.assertIn('SEARCH fingerprints USING PRIMARY KEY (hash_value=?)', details)
+    
+    def test_store_mismatched_lengths(self):
+        """Test hashes and offsets of different lengths are rejected before writing."""
+        with self.assertRaises(ValueError):
+            self.storage.store_fingerprint('song_1', {'title': 'Song 1'}, [12345, 23456], [0])
+        
+        self.assertIsNone(self.storage.get_song_metadata('song_1'))
+    
+    def test_song_metadata_cached(self):
+        """Test repeated metadata lookups skip SQL until the song is rewritten."""
+        self.storage.store_fingerprint('song_1', {'title': 'Old'}, [12345], [0])
+        
+        statements = []
+        conn = self.storage._get_connection()
+        conn.set_trace_callback(statements.append)
+        try:
+            self.assertEqual(self.storage.get_song_metadata('song_1')['title'], 'Old')
+            num_statements = len(statements)
+            
+            # Callers get their own dict, so mutating it leaves the cache intact
+            self.storage.get_song_metadata('song_1')['title'] = 'Changed'
+            self.assertEqual(self.storage.get_song_metadata('song_1')['title'], 'Old')
+            self.assertEqual(len(statements), num_statements)
+        finally:
+            conn.set_trace_callback(None)
+        
+        self.storage.store_fingerprint('song_1', {'title': 'New'}, [12345], [0])
+        self.assertEqual(self.storage.get_song_metadata('song_1')['title'], 'New')
+        
+        self.storage.delete_song('song_1')
+        self.assertIsNone(self.storage.get_song_metadata('song_1'))
+    
+    def test_transaction_boundaries(self):
+        """Test writes run in explicit transactions and leave the connection in autocommit."""
+        conn = self.storage._get_connection()
+        self.assertIsNone(conn.isolation_level)
+        
+        with self.storage._transaction():
+            self.assertTrue(conn.in_transaction)
+        self.assertFalse(conn.in_transaction)
+        
+        self.storage.store_fingerprint('song_1', {'title': 'Song 1'}, [12345], [0])
+        self.assertFalse(conn.in_transaction)
+        
+        # A failure inside the block rolls back and releases the write lock
+        with self.assertRaises(RuntimeError):
+            with self.storage._transaction() as cursor:
+                cursor.execute('DELETE FROM songs')
+                raise RuntimeError('abort')
+        self.assertFalse(conn.in_transaction)
+        self.assertEqual(self.storage.get_stats()['total_songs'], 1)
+    
+    def test_store_rolls_back_on_error(self):
+        """Test a failed store leaves no partial song behind."""
+        with self.assertRaises(OverflowError):
+            self.storage.store_fingerprint('bad_song', {'title': 'Bad'}, [2 ** 70], [0])
+        
+        self.assertIsNone(self.storage.get_song_metadata('bad_song'))
+        self.assertEqual(self.storage.get_stats()['total_songs'], 0)
+
+
+class TestSQLiteStoreFile(unittest.TestCase):
+    """Test cases for SQLiteStore that need a database file."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        # Create temporary database in its own directory, which also holds
+        # the WAL side files
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'test.db')
+        self.storage = SQLiteStore(self.db_path)
+    
+    def tearDown(self):
+        """Clean up test fixtures."""
+        self.storage.close()
+        self.temp_dir.cleanup()
+    
+    def test_old_schema_migrated(self):
+        """Test databases with TEXT song keys are upgraded on open."""
+        self.storage.close()
+        os.unlink(self.db_path)
+        
+        # Schema and rows as written by the original SQLiteStore
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            CREATE TABLE songs (
+                song_id TEXT PRIMARY KEY, title TEXT, artist TEXT,
+                filepath TEXT, duration REAL, metadata TEXT
+            )
+        ''')
+        conn.execute('CREATE TABLE fingerprints (hash_value INTEGER, song_id TEXT, time_offset INTEGER)')
+        conn.execute('CREATE INDEX idx_hash_value ON fingerprints(hash_value)')
+        conn.execute(
+            "INSERT INTO songs VALUES ('song_1', 'Song 1', '', '', 0.0, ?)",
+            ('{"title": "Song 1"}',)
+        )
+        conn.executemany(
+            "INSERT INTO fingerprints VALUES (?, 'song_1', ?)",
+            [(12345, 0), (23456, 5), (12345, 0)]
+        )
+        conn.commit()
+        conn.close()
+        
+        self.storage = SQLiteStore(self.db_path)
+        
+        self.assertEqual(self.storage.get_song_metadata('song_1')['title'], 'Song 1')
+        self.assertEqual(self.storage.query_hash(12345), [('song_1', 0)])
+        self.assertEqual(self.storage.query_hash(23456), [('song_1', 5)])
+        self.assertEqual(self.storage.get_stats()['total_hashes'], 2)
+        
+        # Newly stored songs use the upgraded tables
+        self.storage.store_fingerprint('song_2', {'title': 'Song 2'}, [12345], [3])
+        self.assertEqual(sorted(self.storage.query_hash(12345)), [('song_1', 0), ('song_2', 3)])
+    
     def test_persistence(self):
         """Test that data persists across instances."""
         song_id = 'persistent_song'
@@ -144,18 +454,182 @@ class TestSQLiteStore(unittest.TestCase):
         self.storage.store_fingerprint(
             song_id,
             {'title': 'Persistent Song'},
-            [(12345, 0, song_id)]
+            [12345],
+            [0]
         )
         
         # Create new instance with same database
-        storage2 = SQLiteStore(self.temp_db.name)
+        storage2 = SQLiteStore(self.db_path)
         
         # Retrieve from second instance
         metadata = storage2.get_song_metadata(song_id)
         self.assertIsNotNone(metadata)
         self.assertEqual(metadata['title'], 'Persistent Song')
+        storage2.close()
+    
+    def test_query_from_other_threads(self):
+        """Test that each thread gets its own working connection."""
+        self.storage.store_fingerprint('song_1', {'title': 'Song 1'}, [12345], [7])
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(self.storage.query_hash, [12345] * 8))
+        
+        for result in results:
+            self.assertEqual(result, [('song_1', 7)])
+    
+    def test_thread_connections_closed(self):
+        """Test connections opened by finished threads are released."""
+        for _ in range(10):
+            thread = threading.Thread(target=self.storage.get_stats)
+            thread.start()
+            thread.join()
+        
+        # Only the connection of the thread that created the store remains
+        self.assertEqual(len(self.storage._connections), 1)
+    
+    def test_connection_pragmas(self):
+        """Test connections use WAL with NORMAL sync and in-memory temp storage."""
+        conn = self.storage._get_connection()
+        
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        self.assertEqual(conn.execute('PRAGMA synchronous').fetchone()[0], 1)
+        self.assertEqual(conn.execute('PRAGMA temp_store').fetchone()[0], 2)
+        
+        # In-memory databases cannot use WAL and keep their default journal
+        memory_storage = SQLiteStore(':memory:')
+        try:
+            memory_conn = memory_storage._get_connection()
+            self.assertEqual(memory_conn.execute('PRAGMA journal_mode').fetchone()[0], 'memory')
+        finally:
+            memory_storage.close()
+    
+    def test_bulk_load(self):
+        """Test bulk-load mode relaxes and then restores synchronous."""
+        conn = self.storage._get_connection()
+        
+        self.storage.begin_bulk_load()
+        self.assertEqual(conn.execute('PRAGMA synchronous').fetchone()[0], 0)
+        
+        # Connections opened during the load pick up the setting too
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(
+                self.storage.store_fingerprint, 'song_1', {'title': 'Song 1'}, [12345], [7]
+            ).result()
+        
+        self.storage.end_bulk_load()
+        self.assertEqual(conn.execute('PRAGMA synchronous').fetchone()[0], 1)
+        self.assertEqual(self.storage.query_hash(12345), [('song_1', 7)])
 
 
-if __name__ == '__main__':
-    unittest.main()
+
+class TestMmapStore(unittest.TestCase):
+    """Test cases for MmapStore."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.index_dir = os.path.join(self.temp_dir.name, 'index')
+        self.storage = MmapStore(self.index_dir)
+    
+    def tearDown(self):
+        """Clean up test fixtures."""
+        self.temp_dir.cleanup()
+    
+    def test_save_and_reopen(self):
+        """Test a saved index reopens memory-mapped with the same contents."""
+        self.storage.store_fingerprint('song1', {'title': 'Song 1'}, [12345, 23456, 12345], [0, 5, 10])
+        self.storage.store_fingerprint('song2', {'title': 'Song 2'}, [12345], [7])
+        self.storage.save()
+        
+        reopened = MmapStore(self.index_dir)
+        
+        self.assertIsInstance(reopened.to_arrays()['hash_values'], np.memmap)
+        self.assertEqual(
+            sorted(reopened.query_hash(12345)),
+            [('song1', 0), ('song1', 10), ('song2', 7)]
+        )
+        self.assertEqual(reopened.get_song_metadata('song2')['title'], 'Song 2')
+        self.assertEqual(reopened.get_stats(), self.storage.get_stats())
+    
+    def test_bulk_load_saves(self):
+        """Test end_bulk_load writes the index to disk."""
+        self.storage.begin_bulk_load()
+        self.storage.store_fingerprint('song1', {'title': 'Song 1'}, [12345], [0])
+        self.storage.end_bulk_load()
+        
+        self.assertEqual(MmapStore(self.index_dir).query_hash(12345), [('song1', 0)])
+    
+    def test_update_mapped_index(self):
+        """Test songs added to and deleted from a reopened index are saved."""
+        self.storage.store_fingerprint('song1', {'title': 'Song 1'}, [12345], [0])
+        self.storage.store_fingerprint('song2', {'title': 'Song 2'}, [23456], [3])
+        self.storage.save()
+        
+        reopened = MmapStore(self.index_dir)
+        reopened.store_fingerprint('song3', {'title': 'Song 3'}, [12345], [9])
+        reopened.delete_song('song2')
+        reopened.save()
+        
+        final = MmapStore(self.index_dir)
+        self.assertEqual(sorted(final.query_hash(12345)), [('song1', 0), ('song3', 9)])
+        self.assertEqual(final.query_hash(23456), [])
+        self.assertEqual(final.get_stats()['total_hashes'], 2)
+
+
+class _FakeConnection:
+    """Connection double recording the statements run on it."""
+    
+    def __init__(self):
+        self.statements = []
+    
+    def cursor(self):
+        return self
+    
+    def execute(self, statement, params=None):
+        self.statements.append(statement)
+    
+    def commit(self):
+        pass
+    
+    def rollback(self):
+        pass
+
+
+class _FakePool:
+    """Pool double that, like ThreadedConnectionPool, closes connections returned beyond minconn."""
+    
+    def __init__(self, minconn):
+        self.minconn = minconn
+        self.idle = []
+    
+    def getconn(self):
+        return self.idle.pop() if self.idle else _FakeConnection()
+    
+    def putconn(self, conn):
+        if len(self.idle) < self.minconn:
+            self.idle.append(conn)
+
+
+class TestPostgresStorePool(unittest.TestCase):
+    """Test cases for PostgresStore's per-connection prepared statements."""
+    
+    def setUp(self):
+        """Set up a store on a pool double, without a database server."""
+        self.storage = PostgresStore.__new__(PostgresStore)
+        self.storage.pool = _FakePool(minconn=1)
+        self.storage._prepared_connections = weakref.WeakSet()
+    
+    def _borrow_two(self):
+        """Hold two connections at once and return both to the pool."""
+        with self.storage._connection() as first:
+            with self.storage._connection() as second:
+                connections = [first, second]
+        return connections
+    
+    def test_reacquired_connections_prepared(self):
+        """Test connections opened after the pool closed others get PREPAREd."""
+        for _ in range(5):
+            for conn in self._borrow_two():
+                prepares = [s for s in conn.statements if s.startswith('PREPARE')]
+                self.assertEqual(len(prepares), len(PostgresStore.PREPARED_STATEMENTS))
 